@@ -2,7 +2,8 @@ from __future__ import unicode_literals
 
 from django.apps import AppConfig
 from django.db.models.fields import Field
-from handyhelpers.lookups import NotEqual
+from django.db.models.fields.related import ForeignObject
+from handyhelpers.lookups import LOOKUPS, RELATED_LOOKUPS
 
 
 class HandyHelpersConfig(AppConfig):
@@ -11,4 +12,11 @@ class HandyHelpersConfig(AppConfig):
 
     def ready(self):
         # register field lookups
-        Field.register_lookup(NotEqual)
+        for lookup in LOOKUPS:
+            Field.register_lookup(lookup)
+        for lookup in RELATED_LOOKUPS:
+            ForeignObject.register_lookup(lookup)
+
+        # cache model introspection used by HandyHelperModelManager
+        from handyhelpers.managers import populate_introspection_registry
+        populate_introspection_registry()
@@ -4,6 +4,8 @@ Permissions classes used with DRF APIs
 
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from handyhelpers.querysets import filter_by_group_scope
+
 
 class IsAdminOrReadOnly(BasePermission):
     """ The request is authenticated as an admin, or is a read-only request. """
@@ -58,3 +60,27 @@ class IsInAnyGroup(BasePermission):
         if required_groups is None:
             return False
         return any(group in [i.name for i in request.user.groups.all()] for group in required_groups)
+
+
+class GroupScopedViewSetMixin:
+    """
+    Description:
+        Restrict the rows of a viewset's queryset to those owned by any of the user's groups. The restriction is applied
+        in the database by filtering the lookup path defined in group_scope_field on the user's groups, and applies to
+        list, detail and write actions alike.
+
+    Usage:
+        add as mixin to class definition and put the following in your viewset:
+            group_scope_field = 'team__groups'
+            group_scope_superuser_bypass = True   (optional; superusers see all rows; defaults to True)
+    """
+    group_scope_field = None
+    group_scope_superuser_bypass = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.group_scope_field:
+            return queryset
+        if self.group_scope_superuser_bypass and self.request.user.is_superuser:
+            return queryset
+        return filter_by_group_scope(queryset, self.request.user, self.group_scope_field)
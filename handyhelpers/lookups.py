@@ -3,26 +3,149 @@ This file contains custom filter lookups as per: https://docs.djangoproject.com/
 
 https://docs.djangoproject.com/en/2.2/ref/models/lookups/
 https://docs.djangoproject.com/en/2.2/ref/models/querysets/#field-lookups
+
+The lookups are registered on all fields when the handyhelpers app is ready and can be used in querysets and in the
+query parameters of views using the FilterByQueryParamsMixin (ex. ?status__ne=closed, ?name__prefix=web,
+?id__not_in_subquery=1,2,3).
 """
 
+from django.core.exceptions import EmptyResultSet
 from django.db.models import Lookup
+from django.db.models.fields.related_lookups import RelatedLookupMixin
+from django.db.models.lookups import Contains, Exact, IContains, In, StartsWith
+from django.db.models.sql.query import Query
+from django.db.models.sql.where import AND
+
 
+class NullSafeMixin:
+    """ include rows where the left-hand side is NULL, which a negated comparison would otherwise drop """
 
-class NotEqual(Lookup):
+    def lhs_is_nullable(self, compiler):
+        """ return True if the left-hand side can be NULL (nullable field, or a column of a joined table) """
+        field = getattr(self.lhs, 'target', None)
+        return field is None or field.null or getattr(self.lhs, 'alias', None) != compiler.query.base_table
+
+    def null_safe(self, sql, params, compiler, connection):
+        """ return sql extended to match rows where the left-hand side is NULL """
+        if not self.lhs_is_nullable(compiler):
+            return sql, params
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return '(%s OR %s IS NULL)' % (sql, lhs), params + lhs_params
+
+
+class NotEqual(NullSafeMixin, Lookup):
+    """ field__ne=value; rows where the field is not equal to value, including rows where the field is NULL. A value
+    of None matches rows where the field is not NULL. """
     lookup_name = 'ne'
+    can_use_none_as_rhs = True
 
     def as_sql(self, compiler, connection):
         lhs, lhs_params = self.process_lhs(compiler, connection)
+        if self.rhs is None:
+            return '%s IS NOT NULL' % lhs, lhs_params
         rhs, rhs_params = self.process_rhs(compiler, connection)
         params = lhs_params + rhs_params
-        return '%s <> %s' % (lhs, rhs), params
+        return self.null_safe('%s <> %s' % (lhs, rhs), params, compiler, connection)
+
 
+class RelatedNotEqual(RelatedLookupMixin, NotEqual):
+    """ ne lookup for relations; value may be a model instance or a primary key """
 
-class Exclude(Lookup):
+
+class Exclude(NullSafeMixin, Lookup):
+    """ field__excludes=value; rows where the field does not contain value (wildcards in value are escaped),
+    including rows where the field is NULL """
     lookup_name = 'excludes'
+    prepare_rhs = False
+    contains_lookup = Contains
 
     def as_sql(self, compiler, connection):
-        lhs, lhs_params = self.process_lhs(compiler, connection)
-        rhs, rhs_params = self.process_rhs(compiler, connection)
-        params = lhs_params + rhs_params
-        return 'NOT (%s LIKE %s)' % (lhs, rhs), params
+        sql, params = compiler.compile(self.contains_lookup(self.lhs, self.rhs))
+        return self.null_safe('NOT (%s)' % sql, params, compiler, connection)
+
+
+class IExclude(Exclude):
+    """ field__iexcludes=value; case-insensitive version of excludes """
+    lookup_name = 'iexcludes'
+    contains_lookup = IContains
+
+
+class Prefix(Lookup):
+    """ field__prefix=value; case-sensitive prefix match that can use a regular index. On SQLite, where LIKE cannot
+    use an index, it is compiled as a range (field >= value AND field < next value); other backends use startswith,
+    which PostgreSQL serves from the pattern index Django creates for indexed text fields. """
+    lookup_name = 'prefix'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        if connection.vendor == 'sqlite' and isinstance(self.rhs, str) and self.rhs and self.rhs[-1] < '\U0010ffff':
+            lhs, lhs_params = self.process_lhs(compiler, connection)
+            upper = self.rhs[:-1] + chr(ord(self.rhs[-1]) + 1)
+            return '(%s >= %%s AND %s < %%s)' % (lhs, lhs), lhs_params + [self.rhs] + lhs_params + [upper]
+        return compiler.compile(StartsWith(self.lhs, self.rhs))
+
+
+class ExistsIn(NullSafeMixin, Lookup):
+    """ field__exists_in=queryset; rows where the field matches a value selected by queryset (the primary key, or
+    the single field selected with values()), compiled as a correlated EXISTS subquery (semi-join). A list of values,
+    or a comma-separated string as passed in query parameters, is compiled as IN. """
+    lookup_name = 'exists_in'
+    prepare_rhs = False
+    negated = False
+
+    def get_prep_lookup(self):
+        if isinstance(self.rhs, str):
+            return [i.strip() for i in self.rhs.split(',') if i.strip()]
+        return super().get_prep_lookup()
+
+    def as_sql(self, compiler, connection):
+        if not isinstance(self.rhs, Query):
+            return self.as_in_sql(compiler, connection)
+        inner = self.rhs.clone()
+        if inner.select:
+            if len(inner.select) != 1:
+                raise ValueError('The queryset of the {} lookup must select a single field.'.format(self.lookup_name))
+            value = inner.select[0]
+        else:
+            value = inner.model._meta.pk.get_col(inner.get_initial_alias())
+        alias = getattr(self.lhs, 'alias', None)
+        table = compiler.query.alias_map.get(alias)
+        if table is not None and table.table_name != alias:
+            inner.external_aliases.add(alias)
+        inner.where.add(Exact(value, self.lhs), AND)
+        inner.clear_ordering(True)
+        try:
+            sql, params = inner.get_compiler(connection=connection).as_sql()
+        except EmptyResultSet:
+            # an empty queryset (such as none()); NOT EXISTS matches every row
+            if self.negated:
+                return '', []
+            raise
+        return '%sEXISTS (%s)' % ('NOT ' if self.negated else '', sql), params
+
+    def as_in_sql(self, compiler, connection):
+        """ return sql matching a list of values with IN, or NOT IN including rows where the field is NULL """
+        values = [i for i in self.rhs if i is not None]
+        try:
+            sql, params = compiler.compile(In(self.lhs, values))
+        except EmptyResultSet:
+            if self.negated:
+                return '', []
+            raise
+        if not self.negated:
+            return sql, params
+        return self.null_safe('NOT (%s)' % sql, params, compiler, connection)
+
+
+class NotInSubquery(ExistsIn):
+    """ field__not_in_subquery=queryset; rows where the field does not match any value selected by queryset, compiled
+    as a correlated NOT EXISTS subquery (anti-join). Unlike NOT IN, rows where the field is NULL and querysets
+    selecting NULL values are handled as expected. A list of values, or a comma-separated string, is compiled as a
+    NULL-safe NOT IN. """
+    lookup_name = 'not_in_subquery'
+    negated = True
+
+
+# lookups registered on all fields, and on relations (ForeignKey, OneToOneField) which only use their own lookups
+LOOKUPS = (NotEqual, Exclude, IExclude, Prefix, ExistsIn, NotInSubquery)
+RELATED_LOOKUPS = (RelatedNotEqual, ExistsIn, NotInSubquery)
@@ -0,0 +1,342 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.apps import apps
+from django.conf import settings
+from django.db import NotSupportedError, connections, migrations, models
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.urls import URLPattern, URLResolver, get_resolver
+import os
+import re
+
+from handyhelpers.mixins.view_mixins import FilterByQueryParamsMixin
+from handyhelpers.querysets import approx_distinct
+
+__version__ = "0.0.1"
+
+
+class Command(BaseCommand):
+    help = 'Report missing single and composite indexes for the access paths declared in views, viewsets and admin ' \
+           'classes, and optionally in a captured query log; optionally write migrations adding them'
+
+    # lookups a regular (b-tree) index cannot serve
+    unindexed_lookups = ('contains', 'icontains', 'iexact', 'istartswith', 'endswith', 'iendswith', 'regex', 'iregex',
+                         'search', 'ne', 'excludes', 'iexcludes')
+
+    # admin search_fields prefixes and the lookups they use
+    admin_search_lookups = {'^': 'istartswith', '=': 'iexact', '@': 'search'}
+
+    # EXPLAIN output of a full table scan, per database vendor; {table} is replaced by the table name
+    full_scan_patterns = {
+        'sqlite': r'\bSCAN (?:TABLE )?{table}\b',
+        'postgresql': r'\bSeq Scan on {table}\b',
+        'mysql': r'\bALL\b',
+    }
+
+    # comparisons in a logged WHERE clause; equality comparisons lead composite indexes, followed by one range
+    log_column = re.compile(r'[`"](\w+)[`"]\.[`"](\w+)[`"]\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b)', re.IGNORECASE)
+    log_where = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bHAVING\b|\bLIMIT\b|$)',
+                           re.IGNORECASE | re.DOTALL)
+
+    def __init__(self, *args, **kwargs):
+        self.opts = None
+        self.connection = None
+        self.candidates = {}
+        self.notes = {}
+        super(Command, self).__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        """ define command arguments """
+        parser.add_argument('app', type=str, nargs='*', help='limit the report to these apps; all apps by default')
+        parser.add_argument('--query_log', type=str, default=None,
+                            help='file of captured SQL statements, one per line (django.db.backends debug log lines '
+                                 'are accepted)')
+        parser.add_argument('--database', type=str, default='default', help='database to inspect')
+        parser.add_argument('--min_rows', type=int, default=1000, help='skip tables with fewer estimated rows')
+        parser.add_argument('--fraction', type=float, default=0.01,
+                            help='fraction of rows sampled to estimate row counts and distinct values')
+        parser.add_argument('--max_columns', type=int, default=3, help='maximum number of columns in an index')
+        parser.add_argument('--max_selectivity', type=float, default=0.05,
+                            help='skip access paths matching more than this fraction of rows per lookup (ex. a '
+                                 'status column with a few distinct values)')
+        parser.add_argument('--migration', action='store_true',
+                            help='write a migration adding the reported indexes in each app of the project (apps '
+                                 'under BASE_DIR) or in each app named')
+
+    def handle(self, *args, **options):
+        """ command entry point """
+        self.opts = options
+        self.connection = connections[options['database']]
+        for app in options['app']:
+            if app not in settings.INSTALLED_APPS and app not in [i.label for i in apps.get_app_configs()]:
+                raise CommandError('\'{}\' is not an available application in this project'.format(app))
+
+        self.collect_view_paths()
+        self.collect_admin_paths()
+        if options['query_log']:
+            self.collect_log_paths(options['query_log'])
+
+        advice = [i for i in (self.get_advice(model, fields) for model, fields in self.candidates) if i]
+        advice.sort(key=lambda i: i['saved'] * i['weight'], reverse=True)
+        self.report(advice)
+        for (model, field_name), note in sorted(self.notes.items(), key=lambda i: (i[0][0]._meta.label, i[0][1])):
+            self.stdout.write('{}.{}: {}'.format(model._meta.label, field_name, note))
+        if options['migration'] and advice:
+            self.write_migrations(advice)
+        self.stdout.write(self.style.SUCCESS('Index advice complete!'))
+
+    def is_included(self, model):
+        """ return True if a model is in the apps included in the report """
+        if not model._meta.managed or model._meta.proxy or model._meta.swapped:
+            return False
+        app = model._meta.app_config
+        return not self.opts['app'] or app.label in self.opts['app'] or app.name in self.opts['app']
+
+    def is_writable(self, app_config):
+        """ return True if migrations may be written to an app: apps named on the command line, or apps of the
+        project (under settings.BASE_DIR and not an installed package) when no app is named """
+        if self.opts['app']:
+            return app_config.label in self.opts['app'] or app_config.name in self.opts['app']
+        base_dir = getattr(settings, 'BASE_DIR', None)
+        if not base_dir:
+            return False
+        path = os.path.realpath(app_config.path)
+        if set(path.split(os.sep)) & {'site-packages', 'dist-packages'}:
+            return False
+        return path.startswith(os.path.join(os.path.realpath(base_dir), ''))
+
+    def resolve_path(self, model, path):
+        """ return the concrete field filtered by a lookup path (ex. owner__name__in), following relations; None if
+        the path is invalid or its lookup cannot use a regular index """
+        parts = path.split('__')
+        try:
+            field = model._meta.get_field(parts[0])
+        except FieldDoesNotExist:
+            return None
+        for part in parts[1:]:
+            if field.is_relation and field.related_model:
+                try:
+                    field = field.related_model._meta.get_field(part)
+                    continue
+                except FieldDoesNotExist:
+                    pass
+            if part in self.unindexed_lookups:
+                return None
+            break
+        if not field.concrete or field.many_to_many:
+            return None
+        return field
+
+    def add_candidate(self, fields, source, weight=1):
+        """ record an access path filtering a list of fields of the same model """
+        fields = tuple(dict.fromkeys(fields))[:self.opts['max_columns']]
+        if not fields or not self.is_included(fields[0].model):
+            return
+        key = (fields[0].model, tuple(i.name for i in fields))
+        candidate = self.candidates.setdefault(key, {'sources': [], 'weight': 0})
+        if source not in candidate['sources']:
+            candidate['sources'].append(source)
+        candidate['weight'] += weight
+
+    def add_path(self, model, path, source):
+        """ record an access path declared as a lookup path on a model """
+        field = self.resolve_path(model, path)
+        if field is not None:
+            self.add_candidate([field], source)
+
+    @staticmethod
+    def get_view_classes(patterns):
+        """ yield the view classes of a list of url patterns, including those of included url confs """
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from Command.get_view_classes(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern):
+                view_class = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+                if view_class is not None:
+                    yield view_class
+
+    def collect_view_paths(self):
+        """ collect the filters declared by viewsets (filterset_fields, filter_fields) and the filter form fields of
+        views using the FilterByQueryParamsMixin """
+        for view_class in dict.fromkeys(self.get_view_classes(get_resolver().url_patterns)):
+            queryset = getattr(view_class, 'queryset', None)
+            model = getattr(queryset, 'model', None) or getattr(view_class, 'model', None)
+            if model is None or not isinstance(model, type) or not issubclass(model, models.Model):
+                continue
+            source = view_class.__name__
+            for attr in ('filterset_fields', 'filter_fields'):
+                declared = getattr(view_class, attr, None) or []
+                for name in declared:
+                    lookups = declared[name] if isinstance(declared, dict) else ['exact']
+                    if any(i not in self.unindexed_lookups for i in lookups):
+                        self.add_path(model, name, source)
+            form_class = getattr(view_class, 'filter_form_obj', None)
+            if issubclass(view_class, FilterByQueryParamsMixin) and form_class is not None:
+                for name in getattr(form_class, 'base_fields', {}):
+                    self.add_path(model, name, source)
+
+    def collect_admin_paths(self):
+        """ collect the list_filter, date_hierarchy and ordering of registered admin classes; search_fields, which
+        are matched case-insensitively, are noted for full-text search instead """
+        if not apps.is_installed('django.contrib.admin'):
+            return
+        from django.contrib import admin
+        for model, model_admin in admin.site._registry.items():
+            source = '{} admin'.format(model.__name__)
+            for item in model_admin.list_filter:
+                if isinstance(item, (list, tuple)):
+                    item = item[0]
+                if isinstance(item, str):
+                    self.add_path(model, item, source)
+            if model_admin.date_hierarchy:
+                self.add_path(model, model_admin.date_hierarchy, source)
+            if model_admin.ordering:
+                self.add_path(model, model_admin.ordering[0].lstrip('-'), source)
+            for name in model_admin.search_fields:
+                lookup = self.admin_search_lookups.get(name[0], 'icontains')
+                field = self.resolve_path(model, name.lstrip('^=@'))
+                if field is not None and self.is_included(field.model):
+                    self.notes[(field.model, field.name)] = 'searched with {} by {}; a regular index is not used, ' \
+                        'declare it in SEARCH_DEFINITIONS and run update_search_indexes'.format(lookup, source)
+
+    def collect_log_paths(self, path):
+        """ collect the columns compared in the WHERE clauses of a query log; equality comparisons of the same table
+        are combined into composite access paths """
+        tables = {}
+        for model in apps.get_models(include_auto_created=True):
+            tables[model._meta.db_table] = model
+        try:
+            with open(path) as f:
+                lines = f.readlines()
+        except OSError as err:
+            raise CommandError('unable to read the query log: {}'.format(err))
+        for line in lines:
+            sql = re.sub(r'^\(\d+(?:\.\d+)?\)\s*', '', line.strip())
+            sql = re.sub(r';?\s*args=.*$', '', sql)
+            if not re.match(r'(SELECT|UPDATE|DELETE)\b', sql, re.IGNORECASE):
+                continue
+            for where in self.log_where.findall(sql):
+                equality = {}
+                ranges = {}
+                for table, column, operator in self.log_column.findall(where):
+                    model = tables.get(table)
+                    field = next((i for i in model._meta.local_concrete_fields if i.column == column), None) \
+                        if model else None
+                    if field is None:
+                        continue
+                    group = equality if operator.upper() in ('=', 'IN', 'IS') else ranges
+                    group.setdefault(model, []).append(field)
+                for model in set(equality) | set(ranges):
+                    fields = list(dict.fromkeys(equality.get(model, []))) + ranges.get(model, [])[:1]
+                    self.add_candidate(fields, 'query log')
+
+    def get_indexes(self, model):
+        """ return a list of the column lists of the indexes (including primary key and unique constraints) of a
+        model's table """
+        with self.connection.cursor() as cursor:
+            constraints = self.connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return [i['columns'] for i in constraints.values()
+                if (i['index'] or i['unique'] or i['primary_key']) and i['columns'] and None not in i['columns']]
+
+    @staticmethod
+    def get_usable_prefix(indexes, columns):
+        """ return the longest leading column list of an index that a lookup on all of columns can use """
+        best = []
+        for index in indexes:
+            prefix = []
+            for column in index:
+                if column not in columns:
+                    break
+                prefix.append(column)
+            if len(prefix) > len(best):
+                best = prefix
+        return best
+
+    def explain(self, queryset):
+        """ return a tuple of (plan, True if the plan scans the whole table) for a queryset; plan is None if the
+        database does not support EXPLAIN """
+        try:
+            plan = queryset.explain()
+        except (NotSupportedError, ValueError):
+            return None, False
+        pattern = self.full_scan_patterns.get(self.connection.vendor)
+        table = re.escape(queryset.model._meta.db_table)
+        return plan, bool(pattern and re.search(pattern.format(table=table), plan))
+
+    def get_advice(self, model, field_names):
+        """ return a dictionary describing an index to add for an access path; None if the path is served by an
+        existing index, the table is too small to benefit or the lookup matches too many rows to use the index """
+        candidate = self.candidates[(model, field_names)]
+        fields = [model._meta.get_field(i) for i in field_names]
+        columns = [i.column for i in fields]
+        prefix = self.get_usable_prefix(self.get_indexes(model), columns)
+        if len(prefix) == len(columns):
+            return None
+        queryset = model._default_manager.using(self.connection.alias).all()
+        distinct = approx_distinct(queryset, field_names, self.opts['fraction'])
+        rows = distinct['rows']
+        if rows < self.opts['min_rows']:
+            return None
+        prefix_names = [i.name for i in fields if i.column in prefix]
+        prefix_distinct = approx_distinct(queryset, prefix_names, self.opts['fraction'])['estimate'] if prefix else 1
+        rows_read = rows / float(max(prefix_distinct, 1))
+        rows_matched = rows / float(max(distinct['estimate'], 1))
+        if rows_read <= rows_matched or rows_matched > rows * self.opts['max_selectivity']:
+            return None
+        values = queryset.exclude(**{'{}__isnull'.format(i): True for i in field_names}) \
+            .values_list(*field_names).first()
+        plan, full_scan = self.explain(queryset.filter(**dict(zip(field_names, values)))) if values else (None, False)
+        index = models.Index(fields=list(field_names), name='')
+        index.set_name_with_model(model)
+        return {'model': model, 'fields': field_names, 'index': index, 'rows': rows, 'rows_read': rows_read,
+                'rows_matched': rows_matched, 'saved': rows_read - rows_matched, 'weight': candidate['weight'],
+                'sources': candidate['sources'], 'existing': prefix_names, 'plan': plan, 'full_scan': full_scan}
+
+    def report(self, advice):
+        """ write the missing indexes, most beneficial first """
+        if not advice:
+            self.stdout.write('No missing indexes found')
+            return
+        self.stdout.write('{:<30} {:<30} {:>12} {:>12} {:>12} {:>7}  {}'.format(
+            'model', 'fields', 'rows', 'rows read', 'rows match', 'uses', 'plan'))
+        for item in advice:
+            if item['plan'] is None:
+                plan = 'n/a'
+            elif item['full_scan']:
+                plan = 'full scan'
+            else:
+                plan = 'partial index' if item['existing'] else 'no full scan'
+            self.stdout.write('{:<30} {:<30} {:>12} {:>12.0f} {:>12.1f} {:>7}  {}'.format(
+                item['model']._meta.label, ', '.join(item['fields']), item['rows'], item['rows_read'],
+                item['rows_matched'], item['weight'], plan))
+            self.stdout.write('    declared by: {}'.format(', '.join(item['sources'])))
+            self.stdout.write('    models.Index(fields={}, name=\'{}\')'.format(list(item['fields']),
+                                                                               item['index'].name))
+
+    def write_migrations(self, advice):
+        """ write a migration adding the reported indexes in each app """
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        by_app = {}
+        for item in advice:
+            by_app.setdefault(item['model']._meta.app_label, []).append(item)
+        for app_label, items in sorted(by_app.items()):
+            if not self.is_writable(apps.get_app_config(app_label)):
+                self.stderr.write('{}: app is not part of the project; migration not written, name the app to '
+                                  'write it'.format(app_label))
+                continue
+            leaf_nodes = loader.graph.leaf_nodes(app_label)
+            if app_label not in loader.migrated_apps or not leaf_nodes:
+                self.stderr.write('{}: app has no migrations; migration not written'.format(app_label))
+                continue
+            number = max(MigrationAutodetector.parse_number(i[1]) or 0 for i in leaf_nodes)
+            migration = migrations.Migration('{:04d}_advised_indexes'.format(number + 1), app_label)
+            migration.dependencies = leaf_nodes
+            migration.operations = [migrations.AddIndex(model_name=i['model']._meta.model_name, index=i['index'])
+                                    for i in items]
+            writer = MigrationWriter(migration)
+            os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+            with open(writer.path, 'w') as f:
+                f.write(writer.as_string())
+            self.stdout.write('{}: wrote {}; add the indexes to Meta.indexes of the models so makemigrations does '
+                              'not remove them'.format(app_label, writer.path))
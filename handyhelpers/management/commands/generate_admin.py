@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.apps import apps
 from django.conf import settings
+from django.db import DatabaseError
 from jinja2 import Template
 import os
 
@@ -10,17 +11,26 @@ __version__ = "0.0.1"
 class Command(BaseCommand):
     help = "Generate admin.py file, based on a jinja2 template, for a given app"
 
-    def __inti__(self):
+    # field types searched, and date types used as date_hierarchy, when indexed
+    search_field_types = ('CharField', 'SlugField')
+    date_field_types = ('DateTimeField', 'DateField')
+
+    def __init__(self, *args, **kwargs):
         self.opts = None
         self.app = None
         self.model_list = None
-        super(Command, self).__init__()
+        self.row_counts = {}
+        super(Command, self).__init__(*args, **kwargs)
 
     def add_arguments(self, parser):
         """ define command arguments """
         parser.add_argument('app', type=str, help='name of the django app')
         parser.add_argument('--template', type=str, help='path to Jinja template used to create admin.py file')
         parser.add_argument('--output_file', type=str, help='path of output file to create')
+        parser.add_argument('--large_table', type=int, default=1000,
+                            help='rows from which a related table uses autocomplete or raw id widgets; tables that '
+                                 'cannot be counted are treated as large')
+        parser.add_argument('--max_search_fields', type=int, default=3, help='maximum number of search fields')
 
     def handle(self, *args, **options):
         """ command entry point """
@@ -76,36 +86,101 @@ class Command(BaseCommand):
             f.write(file_text)
 
     @staticmethod
-    def get_display_fields(model, exclude_field_list=()):
-        """ build and return a list of 'list_display' to be used in admin.py for a given model """
-        return [i.name for i in model._meta.fields if i.get_internal_type() not in exclude_field_list]
+    def is_parent_link(field):
+        """ return True if a field is the link of a multi-table inheritance child to its parent """
+        return bool(field.remote_field and field.remote_field.parent_link)
 
-    @staticmethod
-    def get_search_fields(model, exclude_field_list=('AutoField', 'BooleanField', 'DateTimeField', 'ForeignKey')):
-        """ build and return a list of 'search_fields' to be used in admin.py for a given model """
-        return [i.name for i in model._meta.fields if i.get_internal_type() not in exclude_field_list]
+    def get_display_fields(self, model, exclude_field_list=('TextField', 'BinaryField')):
+        """ build and return a list of 'list_display' to be used in admin.py for a given model """
+        return [i.name for i in model._meta.fields
+                if i.get_internal_type() not in exclude_field_list and not self.is_parent_link(i)]
 
     @staticmethod
-    def get_filter_fields(model, include_field_list=('BooleanField', 'ForeignKey', 'CharField')):
-        """ build and return a list of 'filter_fields' to be used in admin.py for a given model """
-        # return [i.name for i in model._meta.fields if i.get_internal_type() in include_field_list]
+    def is_indexed(field):
+        """ return True if a field is the primary key, unique, indexed or the first column of an index """
+        if field.primary_key or field.unique or field.db_index:
+            return True
+        opts = field.model._meta
+        return any(i.fields and i.fields[0].lstrip('-') == field.name for i in opts.indexes) or \
+            any(i and i[0] == field.name for i in opts.unique_together) or \
+            any(i and i[0] == field.name for i in opts.index_together)
+
+    def get_search_fields(self, model):
+        """ build and return a list of 'search_fields' to be used in admin.py for a given model; limited to indexed
+        text fields to avoid scanning the table on every search """
+        fields = [i.name for i in model._meta.fields
+                  if i.get_internal_type() in self.search_field_types and not i.choices and self.is_indexed(i)]
+        return fields[:self.opts['max_search_fields']]
+
+    def is_large_model(self, model):
+        """ return True if a model's table is large enough to use autocomplete or raw id widgets; rows are counted
+        up to --large_table only, so large tables are not scanned """
+        if model not in self.row_counts:
+            try:
+                self.row_counts[model] = model._default_manager.all()[:self.opts['large_table']].count()
+            except DatabaseError:
+                self.row_counts[model] = None
+        return self.row_counts[model] is None or self.row_counts[model] >= self.opts['large_table']
+
+    def get_large_relations(self, model):
+        """ return the foreign key, one-to-one and many-to-many fields of a model relating to large tables """
+        return [i for i in model._meta.fields + model._meta.many_to_many
+                if i.is_relation and i.related_model and not self.is_parent_link(i)
+                and self.is_large_model(i.related_model)]
+
+    def get_relation_widgets(self, model, search_fields):
+        """ build and return lists of 'autocomplete_fields' and 'raw_id_fields' for relations to large tables;
+        autocomplete is used for models of this app with search fields, raw id widgets otherwise """
+        autocomplete_fields = []
+        raw_id_fields = []
+        for field in self.get_large_relations(model):
+            if field.related_model in self.model_list and search_fields.get(field.related_model):
+                autocomplete_fields.append(field.name)
+            else:
+                raw_id_fields.append(field.name)
+        return autocomplete_fields, raw_id_fields
+
+    def get_select_related_fields(self, display_fields, model):
+        """ build and return a list of 'list_select_related' for the relations shown in list_display """
+        return [i.name for i in model._meta.fields
+                if i.is_relation and i.name in display_fields and not self.is_parent_link(i)]
+
+    def get_filter_fields(self, model, include_field_list=('BooleanField', 'ForeignKey', 'CharField')):
+        """ build and return a list of 'filter_fields' to be used in admin.py for a given model; relations to large
+        tables are excluded as the filter would list every related row """
+        large_relations = self.get_large_relations(model)
         return_list = []
         for i in model._meta.fields:
             field_type = i.get_internal_type()
             if field_type in include_field_list:
                 if field_type == 'CharField' and not i.choices:
                     continue
-                elif field_type == 'CharField' and i.choices:
-                    return_list.append(i.name)
+                elif field_type == 'ForeignKey' and i in large_relations:
+                    continue
                 else:
                     return_list.append(i.name)
         return return_list
 
+    def get_date_hierarchy(self, model):
+        """ return an indexed date field to use as 'date_hierarchy'; None if not available """
+        for i in model._meta.fields:
+            if i.get_internal_type() in self.date_field_types and self.is_indexed(i):
+                return i.name
+        return None
+
     def get_models_and_fields(self):
         return_data = {}
+        search_fields = {model: self.get_search_fields(model) for model in self.model_list}
         for model in self.model_list:
-            return_data[model.__name__] = {'display_fields': self.get_display_fields(model),
-                                           'search_fields': self.get_search_fields(model),
+            display_fields = self.get_display_fields(model)
+            autocomplete_fields, raw_id_fields = self.get_relation_widgets(model, search_fields)
+            return_data[model.__name__] = {'display_fields': display_fields,
+                                           'search_fields': search_fields[model],
                                            'filter_fields': self.get_filter_fields(model),
+                                           'select_related_fields': self.get_select_related_fields(display_fields,
+                                                                                                   model),
+                                           'autocomplete_fields': autocomplete_fields,
+                                           'raw_id_fields': raw_id_fields,
+                                           'date_hierarchy': self.get_date_hierarchy(model),
                                            }
         return return_data
@@ -21,6 +21,12 @@ class Command(BaseCommand):
         parser.add_argument('--api', action='store_true', help='generate views and create apis.py')
         parser.add_argument('--serializer', action='store_true', help='generate serializers and create serializers.py')
         parser.add_argument('--url', action='store_true', help='generate urls and create urls.py')
+        parser.add_argument('--bulk', action='store_true',
+                            help='include bulk create/update/delete endpoints in apis (generates ModelViewSets)')
+        parser.add_argument('--depth', type=int, default=0,
+                            help='serializer depth; related objects are rendered nested up to this depth')
+        parser.add_argument('--m2m', action='store_true',
+                            help='include many-to-many fields (rendered as primary key lists) in serializers')
         parser.add_argument('--output_path', type=str, default=None, help='path where files should be created')
         parser.add_argument('--api_template', type=str, default=None, help='path to Jinja template used to create api')
         parser.add_argument('--serializer_template', type=str, default=None, help='path to Jinja template used to create serializer')
@@ -36,11 +42,13 @@ class Command(BaseCommand):
 
         # build serializers file
         if options['serializer']:
-            self.build_serializers(output_path=options['output_path'], template_file=options['serializer_template'])
+            self.build_serializers(output_path=options['output_path'], template_file=options['serializer_template'],
+                                   depth=options['depth'], m2m=options['m2m'])
 
         # build apis file
         if options['api']:
-            self.build_apis(output_path=options['output_path'], template_file=options['api_template'])
+            self.build_apis(output_path=options['output_path'], template_file=options['api_template'],
+                            bulk=options['bulk'], depth=options['depth'], m2m=options['m2m'])
 
         # build urls file
         if options['url']:
@@ -58,7 +66,50 @@ class Command(BaseCommand):
         """ return a list of field names for a given model """
         return [i.name for i in model._meta.fields if type(i).__name__ not in exclude_list]
 
-    def build_serializers(self, output_path=None, template_file=None):
+    @staticmethod
+    def get_serializer_fields(model, m2m=False):
+        """ return a list of fields rendered by the serializer of a model (concrete fields, and many-to-many fields if
+        m2m is True) """
+        return list(model._meta.fields) + (list(model._meta.many_to_many) if m2m else [])
+
+    @staticmethod
+    def is_parent_link(field):
+        """ return True if a field is the link of a multi-table inheritance child to its parent """
+        return bool(field.remote_field and field.remote_field.parent_link)
+
+    def get_queryset_lookups(self, model, depth=0, m2m=False, prefix='', prefetched=False, lookups=None):
+        """
+        return a dictionary of the only, select_related and prefetch_related lookups needed to serialize a model at a
+        given depth. Forward relations rendered nested are joined (or prefetched when reached through a many-to-many
+        relation) and many-to-many relations are prefetched; those of the model itself only if m2m is True, as nested
+        serializers render all fields. only() is returned when it leaves out fields of the models loaded, and is
+        empty otherwise. Parent links of multi-table inheritance are skipped, as the parent tables are joined by
+        Django.
+        """
+        top = lookups is None
+        if top:
+            lookups = {'only': [], 'select_related': [], 'prefetch_related': [], 'deferred': False}
+        fields = [i for i in self.get_serializer_fields(model, m2m or not top) if not self.is_parent_link(i)]
+        if not prefetched:
+            lookups['deferred'] |= any(i not in fields for i in model._meta.concrete_fields
+                                       if not self.is_parent_link(i))
+        for field in fields:
+            path = prefix + field.name
+            if field.many_to_many:
+                lookups['prefetch_related'].append(path)
+                if depth:
+                    self.get_queryset_lookups(field.related_model, depth - 1, True, path + '__', True, lookups)
+                continue
+            if not prefetched:
+                lookups['only'].append(path)
+            if field.is_relation and depth:
+                lookups['prefetch_related' if prefetched else 'select_related'].append(path)
+                self.get_queryset_lookups(field.related_model, depth - 1, True, path + '__', prefetched, lookups)
+        if top and not lookups.pop('deferred'):
+            lookups['only'] = []
+        return lookups
+
+    def build_serializers(self, output_path=None, template_file=None, depth=0, m2m=False):
         """ build the serializers.py file for a list of model names """
         if not template_file:
             template_file = os.path.join(os.path.dirname(os.path.realpath(__file__)),
@@ -70,13 +121,14 @@ class Command(BaseCommand):
 
         model_fields = {}
         for model in self.model_list:
-            model_fields[model.__name__] = self.get_model_field_names(model)
+            model_fields[model.__name__] = [i.name for i in self.get_serializer_fields(model, m2m)]
 
         data = {'import_models': 'my import statement here',
                 'model_list': self.model_list,
                 'app_name': self.app,
                 'models_file': 'models',
                 'model_fields': model_fields,
+                'depth': depth,
                 'field_list': {'get a list of fields in the model'}
                 }
         with open(template_file) as f:
@@ -85,7 +137,7 @@ class Command(BaseCommand):
         with open(output_path, 'w') as f:
             f.write(file_text)
 
-    def build_apis(self, output_path=None, template_file=None):
+    def build_apis(self, output_path=None, template_file=None, bulk=False, depth=0, m2m=False):
         """ build the apis.py (viewsets) file for a list of model names """
         if not template_file:
             template_file = os.path.join(os.path.dirname(os.path.realpath(__file__)),
@@ -96,15 +148,19 @@ class Command(BaseCommand):
             output_path = '{}/apis.py'.format(output_path)
 
         model_fields = {}
+        queryset_lookups = {}
         for model in self.model_list:
             model_fields[model.__name__] = self.get_model_field_names(model)
+            queryset_lookups[model.__name__] = self.get_queryset_lookups(model, depth=depth, m2m=m2m)
 
         data = {'model_list': self.model_list,
                 'app_name': self.app,
                 'models_file': 'models',
                 'model_fields': model_fields,
+                'queryset_lookups': queryset_lookups,
                 'serializers_file': 'serializers',
-                'viewset_type': 'viewsets.ReadOnlyModelViewSet',
+                'viewset_type': 'viewsets.ModelViewSet' if bulk else 'viewsets.ReadOnlyModelViewSet',
+                'bulk': bulk,
                 }
         with open(template_file) as f:
             template = Template(f.read())
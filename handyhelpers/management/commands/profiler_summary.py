@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from contextlib import closing
+import itertools
+import os
+import time
+
+from handyhelpers.profiler import connect, get_store_path, percentile
+
+__version__ = "0.0.1"
+
+
+class Command(BaseCommand):
+    help = 'Report latency percentiles per view and the slowest SQL statement shapes recorded by the ProfilerMiddleware'
+
+    def add_arguments(self, parser):
+        """ define command arguments """
+        parser.add_argument('--hours', type=float, default=24, help='report requests of the last hours; 0 for all')
+        parser.add_argument('--view', type=str, default=None, help='limit the report to views containing this text')
+        parser.add_argument('--limit', type=int, default=10, help='number of SQL statement shapes to list')
+        parser.add_argument('--store', type=str, default=None,
+                            help='path of the profiler store; defaults to the PROFILER_DATABASE setting')
+        parser.add_argument('--prune_days', type=float, default=None,
+                            help='remove requests older than this number of days from the store before reporting')
+
+    def handle(self, *args, **options):
+        """ command entry point """
+        path = options['store'] or get_store_path()
+        if not os.path.exists(path):
+            raise CommandError('no profiler store found at {}'.format(path))
+        with closing(connect(path)) as db:
+            if options['prune_days'] is not None:
+                self.prune(db, time.time() - options['prune_days'] * 86400)
+            where = 'WHERE timestamp >= ?'
+            params = [time.time() - options['hours'] * 3600 if options['hours'] else 0]
+            if options['view']:
+                where += ' AND view LIKE ?'
+                params.append('%{}%'.format(options['view']))
+            self.report_views(db, where, params)
+            self.report_shapes(db, where, params, options['limit'])
+        self.stdout.write(self.style.SUCCESS('Profiler summary complete!'))
+
+    def prune(self, db, before):
+        """ remove the requests, and their queries, recorded before a timestamp """
+        with db:
+            db.execute('DELETE FROM queries WHERE request_id IN (SELECT id FROM requests WHERE timestamp < ?)',
+                       [before])
+            deleted = db.execute('DELETE FROM requests WHERE timestamp < ?', [before]).rowcount
+        self.stdout.write('{} requests removed'.format(deleted))
+
+    def report_views(self, db, where, params):
+        """ write the request count, latency percentiles and average measurements per view, slowest p95 first """
+        averages = {row[0]: row[1:] for row in db.execute(
+            'SELECT view, COUNT(*), AVG(db_ms), AVG(queries), AVG(template_ms), AVG(response_size) FROM requests '
+            '{} GROUP BY view'.format(where), params)}
+        rows = []
+        latencies = db.execute('SELECT view, total_ms FROM requests {} ORDER BY view, total_ms'.format(where), params)
+        for view, group in itertools.groupby(latencies, key=lambda i: i[0]):
+            values = [i[1] for i in group]
+            rows.append((view, [percentile(values, i) for i in (50, 95, 99)] + [values[-1]], averages[view]))
+        if not rows:
+            self.stdout.write('No profiled requests found')
+            return
+        rows.sort(key=lambda i: i[1][1], reverse=True)
+        self.stdout.write('{:<60} {:>8} {:>9} {:>9} {:>9} {:>9} {:>9} {:>8} {:>9} {:>9}'.format(
+            'view', 'requests', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'db ms', 'queries', 'tmpl ms', 'size kB'))
+        for view, latency, (count, db_ms, queries, template_ms, size) in rows:
+            self.stdout.write('{:<60} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>8.1f} {:>9.1f} {:>9.1f}'
+                              .format(view or '(no view)', count, *latency, db_ms, queries, template_ms,
+                                      (size or 0) / 1024.0))
+
+    def report_shapes(self, db, where, params, limit):
+        """ write the SQL statement shapes taking the most total time """
+        shapes = db.execute(
+            'SELECT q.shape, SUM(q.count), SUM(q.total_ms), COUNT(DISTINCT q.request_id), MAX(q.count) '
+            'FROM queries q JOIN requests ON requests.id = q.request_id {} GROUP BY q.shape '
+            'ORDER BY SUM(q.total_ms) DESC LIMIT ?'.format(where), params + [limit]).fetchall()
+        if not shapes:
+            return
+        self.stdout.write('')
+        self.stdout.write('{:>10} {:>9} {:>9} {:>9} {:>11}  {}'.format(
+            'total ms', 'count', 'avg ms', 'requests', 'max/request', 'SQL shape'))
+        for shape, count, total_ms, requests, max_count in shapes:
+            self.stdout.write('{:>10.1f} {:>9} {:>9.2f} {:>9} {:>11}  {}'.format(
+                total_ms, count, total_ms / count, requests, max_count, shape))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.apps import apps
+from django.conf import settings
+
+from handyhelpers.rollups import update_rollup
+
+__version__ = "0.0.1"
+
+
+class Command(BaseCommand):
+    help = 'Incrementally aggregate rows added since the last run into hourly rollups'
+
+    def add_arguments(self, parser):
+        """ define command arguments """
+        parser.add_argument('model', type=str, nargs='?', default=None,
+                            help='model to roll up (app_label.ModelName); ROLLUP_DEFINITIONS is used if not provided')
+        parser.add_argument('--field', type=str, default='created_at', help='datetime field to bucket rows by')
+        parser.add_argument('--dimension', type=str, action='append', default=[],
+                            help='field to count rows per value of (may be repeated)')
+        parser.add_argument('--settle', type=int, default=60,
+                            help='seconds a row must age before it is rolled up (allows in-flight commits)')
+
+    def handle(self, *args, **options):
+        """ command entry point """
+        if options['model']:
+            definitions = [{'model': options['model'], 'field': options['field'],
+                            'dimensions': options['dimension']}]
+        else:
+            definitions = getattr(settings, 'ROLLUP_DEFINITIONS', [])
+        if not definitions:
+            raise CommandError('provide a model or define ROLLUP_DEFINITIONS in your settings')
+
+        for definition in definitions:
+            try:
+                model = apps.get_model(definition['model'])
+            except (LookupError, ValueError):
+                raise CommandError('\'{}\' is not an available model in this project'.format(definition['model']))
+            field_name = definition.get('field', 'created_at')
+            for dimension in [None] + list(definition.get('dimensions', [])):
+                count = update_rollup(model, field_name, dimension=dimension, settle_seconds=options['settle'])
+                self.stdout.write('{} {} {}: {} rows rolled up'.format(model._meta.label, field_name,
+                                                                        dimension or '(total)', count))
+        self.stdout.write(self.style.SUCCESS('Rollups updated!'))
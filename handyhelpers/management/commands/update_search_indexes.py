@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+
+from handyhelpers.search import SEARCH_INDEX_REGISTRY, get_search_backend
+
+__version__ = "0.0.1"
+
+
+class Command(BaseCommand):
+    help = 'Build (or rebuild) the full-text search indexes of the fields declared in SEARCH_DEFINITIONS'
+
+    def add_arguments(self, parser):
+        """ define command arguments """
+        parser.add_argument('model', type=str, nargs='?', default=None,
+                            help='model to index (app_label.ModelName); SEARCH_DEFINITIONS is used if not provided')
+        parser.add_argument('--field', type=str, action='append', default=[],
+                            help='field to index (may be repeated); required if a model is provided')
+        parser.add_argument('--database', type=str, default='default', help='database to build the indexes in')
+        parser.add_argument('--drop', action='store_true', help='remove the search indexes instead of building them')
+
+    def handle(self, *args, **options):
+        """ command entry point """
+        if options['model']:
+            if not options['field'] and not options['drop']:
+                raise CommandError('provide the fields to index with --field')
+            definitions = [{'model': options['model'], 'fields': options['field']}]
+        else:
+            definitions = getattr(settings, 'SEARCH_DEFINITIONS', [])
+        if not definitions:
+            raise CommandError('provide a model or define SEARCH_DEFINITIONS in your settings')
+
+        connection = connections[options['database']]
+        backend = get_search_backend(connection)
+        for definition in definitions:
+            try:
+                model = apps.get_model(definition['model'])
+            except (LookupError, ValueError):
+                raise CommandError('\'{}\' is not an available model in this project'.format(definition['model']))
+            try:
+                with transaction.atomic(using=connection.alias):
+                    if options['drop']:
+                        backend.drop_index(connection, model)
+                        self.stdout.write('{}: search index removed'.format(model._meta.label))
+                    else:
+                        backend.build_index(connection, model, definition['fields'])
+                        self.stdout.write('{}: search index built on {}'.format(model._meta.label,
+                                                                                ', '.join(definition['fields'])))
+            except ValueError as err:
+                raise CommandError('{}: {}'.format(model._meta.label, err))
+            SEARCH_INDEX_REGISTRY.pop((connection.alias, model), None)
+        self.stdout.write(self.style.SUCCESS('Search indexes updated!'))
@@ -4,13 +4,56 @@ DESCRIPTION:
 """
 
 # system modules
-from random import randint
+import random
+import uuid
 
 # django models
-from django.db import models
+from django.apps import apps
+from django.db import connections, models, transaction
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+# handyhelpers modules
+from handyhelpers.querysets import get_sample_queryset, iterate_in_chunks
+
+# per-model registry of introspection results (fields, field names, foreign keys, properties) built by
+# HandyHelperModelManager; populated when the app registry is ready
+MODEL_INTROSPECTION_REGISTRY = {}
+
+
+def populate_introspection_registry():
+    """ build the introspection results of every installed model managed by a HandyHelperModelManager """
+    for model in apps.get_models():
+        manager = model._default_manager
+        if isinstance(manager, HandyHelperModelManager):
+            manager.get_field_names()
+            manager.get_foreign_key_names()
+            manager.get_properties()
+
+
+def clear_introspection_cache(model=None):
+    """ invalidate cached introspection results of a model, or of all models if a model is not provided (typically
+    used in tests that modify models at runtime) """
+    if model is None:
+        MODEL_INTROSPECTION_REGISTRY.clear()
+    else:
+        MODEL_INTROSPECTION_REGISTRY.pop(model, None)
+
+
+def get_key_filter(field_names, keys):
+    """ return a Q object matching rows by a list of key tuples of the given fields """
+    if len(field_names) == 1:
+        return models.Q(**{'{}__in'.format(field_names[0]): [i[0] for i in keys]})
+    condition = models.Q()
+    for key in keys:
+        condition |= models.Q(**dict(zip(field_names, key)))
+    return condition
 
 
 class HandyHelperModelManager(models.Manager):
+    # number of rounds of random primary key probes used by get_random_rows before falling back to index seeks
+    random_probe_rounds = 5
+
     def get_object_or_none(self, **kwargs):
         """ return object if available; return None if not available """
         try:
@@ -32,61 +75,442 @@ class HandyHelperModelManager(models.Manager):
         except models.ObjectDoesNotExist:
             return None
 
-    def get_fields(self, exclude_list=('OneToOneField')):
-        """ return a list of fields in the model """
-        if not issubclass(self.model, models.Model):
-            return []
-        return [i for i in self.model._meta.fields if type(i).__name__ not in exclude_list]
+    def get_many_or_none(self, field, values, chunk_size=1000, identity_map=None):
+        """ return a dictionary of {value: object} for many values of a unique field (or of a composite natural key)
+        with one query per chunk of values; values without an object map to None.
 
-    def get_field_names(self, exclude_list=('OneToOneField')):
-        """ return a list of field names in the model """
-        if not issubclass(self.model, models.Model):
-            return []
-        return [i.name for i in self.model._meta.fields if type(i).__name__ not in exclude_list]
+        field - field name ('pk' for the primary key), or a tuple of field names for a composite key (values are then
+                tuples)
+        values - iterable of values to look up
+        chunk_size - maximum values per query; limited to the parameter limit of the database backend
+        identity_map - optional dictionary of {value: object} already loaded; these values are not queried and
+                       objects found are added to it """
+        field_names = (field, ) if isinstance(field, str) else tuple(field)
+        fields = [self.model._meta.pk if i == 'pk' else self.model._meta.get_field(i) for i in field_names]
+        composite = not isinstance(field, str)
+
+        def normalize(value):
+            """ convert a requested value to the python value read back from the database """
+            parts = value if composite else (value, )
+            parts = tuple(i.pk if isinstance(i, models.Model) else i for i in parts)
+            parts = tuple((f.target_field if f.is_relation else f).to_python(i) for f, i in zip(fields, parts))
+            return parts if composite else parts[0]
+
+        identity_map = {} if identity_map is None else identity_map
+        results = {}
+        pending = {}
+        for value in values:
+            if value in identity_map:
+                results[value] = identity_map[value]
+            else:
+                results[value] = None
+                pending.setdefault(normalize(value), []).append(value)
+
+        max_query_params = connections[self.db].features.max_query_params
+        if max_query_params:
+            chunk_size = min(chunk_size, max_query_params // len(fields))
+        attnames = [i.attname for i in fields]
+        keys = list(pending)
+        for offset in range(0, len(keys), chunk_size):
+            chunk = keys[offset:offset + chunk_size]
+            for obj in self.filter(get_key_filter(attnames, chunk if composite else [(i, ) for i in chunk])):
+                key = tuple(getattr(obj, i) for i in attnames) if composite else getattr(obj, attnames[0])
+                for value in pending.get(key, ()):
+                    results[value] = obj
+                    identity_map[value] = obj
+        return results
+
+    def bulk_upsert(self, rows, unique_fields, update_fields=None, batch_size=None):
+        """ insert rows, or update the existing rows with the same values of unique_fields, in batches. Uses INSERT ...
+        ON CONFLICT on PostgreSQL and SQLite 3.24+ and INSERT ... ON DUPLICATE KEY UPDATE on MySQL; other backends
+        fall back to bulk_update and bulk_create. Fields with auto_now (such as updated_at) are set on every row and
+        fields with auto_now_add (such as created_at) only on inserted rows. Primary keys are not set on the
+        instances provided. Returns a tuple of (number of rows created, number of rows updated).
+
+        rows - list of dictionaries of {field_name: value} or of unsaved model instances; rows with duplicate keys
+               are reduced to the last one
+        unique_fields - fields of a unique constraint identifying existing rows
+        update_fields - fields to update on existing rows; defaults to the fields provided in the dictionaries (or
+                        all fields for instances), except unique_fields
+        batch_size - maximum rows per statement (defaults to 1000); limited to the parameter limit of the backend """
+        opts = self.model._meta
+        connection = connections[self.db]
+        unique_fields = [opts.get_field(i) for i in unique_fields]
+        if update_fields is None:
+            names = set()
+            for row in rows:
+                names.update(row if isinstance(row, dict) else [i.name for i in opts.concrete_fields])
+            update_fields = [i for i in opts.concrete_fields if i.name in names]
+        else:
+            update_fields = [opts.get_field(i) for i in update_fields]
+        update_fields = [i for i in update_fields if i not in unique_fields and not i.primary_key and
+                         not getattr(i, 'auto_now_add', False)]
+        update_fields += [i for i in opts.concrete_fields if getattr(i, 'auto_now', False) and i not in update_fields]
+        if any(not i.concrete or i.many_to_many for i in unique_fields + update_fields):
+            raise ValueError('bulk_upsert() can only be used with concrete fields.')
+
+        objs = {}
+        for row in rows:
+            obj = self.model(**row) if isinstance(row, dict) else row
+            objs[tuple(getattr(obj, i.attname) for i in unique_fields)] = obj
+        if not objs:
+            return 0, 0
+
+        vendor = connection.vendor
+        native = vendor in ('postgresql', 'mysql') or \
+            (vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 24, 0))
+        created = updated = 0
+        with transaction.atomic(using=self.db, savepoint=False):
+            for has_pk in (True, False):
+                batch_objs = [(key, obj) for key, obj in objs.items() if (obj.pk is not None) is has_pk]
+                if not batch_objs:
+                    continue
+                fields = [i for i in opts.concrete_fields if has_pk or i is not opts.pk]
+                max_batch_size = connection.ops.bulk_batch_size(fields, batch_objs)
+                if connection.features.max_query_params:
+                    max_batch_size = min(max_batch_size, connection.features.max_query_params // len(fields))
+                size = max(min(batch_size or 1000, max_batch_size), 1)
+                for offset in range(0, len(batch_objs), size):
+                    batch = batch_objs[offset:offset + size]
+                    if native:
+                        existing = self.filter(get_key_filter([i.attname for i in unique_fields],
+                                                              [i[0] for i in batch])).count()
+                        self.upsert_batch([i[1] for i in batch], fields, unique_fields, update_fields)
+                    else:
+                        existing = self.upsert_batch_fallback(batch, unique_fields, update_fields)
+                    created += len(batch) - existing
+                    updated += existing
+        return created, updated
+
+    def upsert_batch(self, objs, fields, unique_fields, update_fields):
+        """ insert a batch of instances with a single INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE statement """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        params = []
+        for obj in objs:
+            params += [i.get_db_prep_save(i.pre_save(obj, True), connection) for i in fields]
+        placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+        sql = 'INSERT INTO {} ({}) VALUES {}'.format(qn(self.model._meta.db_table),
+                                                     ', '.join(qn(i.column) for i in fields),
+                                                     ', '.join([placeholders] * len(objs)))
+        if connection.vendor == 'mysql':
+            assignments = ['{0} = VALUES({0})'.format(qn(i.column)) for i in update_fields or unique_fields[:1]]
+            sql += ' ON DUPLICATE KEY UPDATE {}'.format(', '.join(assignments))
+        elif update_fields:
+            sql += ' ON CONFLICT ({}) DO UPDATE SET {}'.format(
+                ', '.join(qn(i.column) for i in unique_fields),
+                ', '.join('{0} = EXCLUDED.{0}'.format(qn(i.column)) for i in update_fields))
+        else:
+            sql += ' ON CONFLICT ({}) DO NOTHING'.format(', '.join(qn(i.column) for i in unique_fields))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def upsert_batch_fallback(self, batch, unique_fields, update_fields):
+        """ update the existing rows of a batch of (key, instance) with bulk_update and insert the others with
+        bulk_create; return the number of existing rows """
+        found = self.get_many_or_none(tuple(i.name for i in unique_fields), [i[0] for i in batch])
+        now = timezone.now()
+        to_update = []
+        to_create = []
+        for key, obj in batch:
+            current = found[key]
+            if current is None:
+                to_create.append(obj)
+                continue
+            for field in update_fields:
+                setattr(current, field.attname, now if getattr(field, 'auto_now', False) else
+                        getattr(obj, field.attname))
+            to_update.append(current)
+        if to_update and update_fields:
+            self.bulk_update(to_update, [i.name for i in update_fields])
+        self.bulk_create(to_create)
+        return len(to_update)
+
+    def update_many(self, values, batch_size=None):
+        """ apply different values per row with one UPDATE ... SET field = CASE ... statement per batch of rows.
+        Fields with auto_now (such as updated_at) are set on every updated row. Returns the number of rows updated.
+
+        values - dictionary of {pk: {field_name: value, ...}}; rows may update different fields
+        batch_size - maximum rows per statement; limited to the parameter limit of the database backend """
+        if not values:
+            return 0
+        opts = self.model._meta
+        connection = connections[self.db]
+        fields = {}
+        for data in values.values():
+            for name in data:
+                if name not in fields:
+                    field = opts.get_field(name)
+                    if not field.concrete or field.many_to_many or field.primary_key:
+                        raise ValueError('update_many() can only be used with concrete, non-primary key fields.')
+                    fields[name] = field
+        auto_now_fields = [i for i in opts.concrete_fields if getattr(i, 'auto_now', False)]
+
+        pk_list = list(values)
+        max_batch_size = connection.ops.bulk_batch_size(['pk', 'pk'] + list(fields.values()), pk_list)
+        batch_size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+        requires_casting = connection.features.requires_casted_case_in_updates
+        now = timezone.now()
+        updated = 0
+        with transaction.atomic(using=self.db, savepoint=False):
+            for offset in range(0, len(pk_list), batch_size):
+                batch = pk_list[offset:offset + batch_size]
+                update_kwargs = {}
+                for name, field in fields.items():
+                    whens = []
+                    for pk in batch:
+                        if name in values[pk]:
+                            value = values[pk][name]
+                            if isinstance(value, models.Model):
+                                value = value.pk
+                            if not hasattr(value, 'resolve_expression'):
+                                value = models.Value(value, output_field=field)
+                            whens.append(models.When(pk=pk, then=value))
+                    if not whens:
+                        continue
+                    case = models.Case(*whens, default=models.F(field.attname), output_field=field)
+                    update_kwargs[field.attname] = Cast(case, output_field=field) if requires_casting else case
+                for field in auto_now_fields:
+                    update_kwargs.setdefault(field.attname, now)
+                updated += self.filter(pk__in=batch).update(**update_kwargs)
+        return updated
+
+    def iterate_in_chunks(self, chunk_size=1000, order='pk', values=None, prefetch_related=None, **kwargs):
+        """ iterate over the rows matching kwargs in chunks paged by a unique field (WHERE order > last) with
+        constant memory use; yields model instances, or tuples of values if a list of field names is provided in
+        values. Lookups in prefetch_related are prefetched per chunk. """
+        queryset = self.filter(**kwargs)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return iterate_in_chunks(queryset, chunk_size, order, values)
+
+    def get_introspection(self, key, build):
+        """ return the cached result (as a tuple) of an introspection of the model; build it on first use """
+        registry = MODEL_INTROSPECTION_REGISTRY.setdefault(self.model, {})
+        if key not in registry:
+            registry[key] = tuple(build()) if issubclass(self.model, models.Model) else ()
+        return registry[key]
+
+    def get_fields(self, exclude_list=('OneToOneField', )):
+        """ return a tuple of fields in the model; exclude_list holds field type names (or a single name) """
+        exclude_list = (exclude_list, ) if isinstance(exclude_list, str) else tuple(exclude_list)
+        return self.get_introspection(('fields', exclude_list), lambda: [
+            i for i in self.model._meta.fields if type(i).__name__ not in exclude_list])
+
+    def get_field_names(self, exclude_list=('OneToOneField', )):
+        """ return a tuple of field names in the model; exclude_list holds field type names (or a single name) """
+        exclude_list = (exclude_list, ) if isinstance(exclude_list, str) else tuple(exclude_list)
+        return self.get_introspection(('field_names', exclude_list), lambda: [
+            i.name for i in self.get_fields(exclude_list)])
 
     def get_properties(self):
-        """ return a list of model property names """
-        if not issubclass(self.model, models.Model):
-            return []
-        properties_list = []
-        for name in dir(self.model):
-            if isinstance(getattr(self.model, name), property):
-                properties_list.append(name)
-        return properties_list
+        """ return a tuple of model property names """
+        def build():
+            names = set()
+            for klass in self.model.__mro__:
+                names.update(name for name, value in vars(klass).items() if isinstance(value, property))
+            return sorted(names)
+        return self.get_introspection('properties', build)
 
     def get_fields_and_properties(self):
-        """ return a list of fields and properties in a model """
+        """ return a tuple of fields and properties in a model """
         return self.get_fields() + self.get_properties()
 
     def get_foreign_keys(self):
-        """ return a list of foreignKeys in the model """
-        if not issubclass(self.model, models.Model):
-            return []
-        return [i for i in self.model._meta.fields if i.get_internal_type() == "ForeignKey"]
+        """ return a tuple of foreignKeys in the model """
+        return self.get_introspection('foreign_keys', lambda: [
+            i for i in self.model._meta.fields if i.get_internal_type() == "ForeignKey"])
 
     def get_foreign_key_names(self):
-        """ return a list of names of foreignKeyfields """
-        return [i.name for i in self.get_foreign_keys()]
+        """ return a tuple of names of foreignKeyfields """
+        return self.get_introspection('foreign_key_names', lambda: [i.name for i in self.get_foreign_keys()])
 
     def get_random_row(self, **kwargs):
-        """ return a single, random entry from a queryset """
+        """ return a single, random entry from a queryset; None if not available """
+        rows = self.get_random_rows(1, **kwargs)
+        return rows[0] if rows else None
+
+    def get_random_rows(self, n, **kwargs):
+        """ return a list of up to n distinct, random entries from a queryset without evaluating or counting it. Integer
+        primary keys are probed at random within the primary key range, PostgreSQL tables with other primary keys are
+        sampled with TABLESAMPLE, UUID primary keys are sought from random UUIDs, and anything else is randomly
+        ordered by the database. """
         queryset = self.filter(**kwargs)
-        if queryset:
-            random_index = randint(0, queryset.count() - 1)
-            return queryset[random_index]
-        return None
+        pk = self.model._meta.pk
+        if isinstance(pk, (models.AutoField, models.IntegerField)):
+            rows = self.get_random_rows_by_probe(queryset, n)
+        elif connections[queryset.db].vendor == 'postgresql':
+            rows = self.get_random_rows_by_tablesample(queryset, n)
+        elif isinstance(pk, models.UUIDField):
+            rows = self.get_random_rows_by_seek(queryset, n, {}, uuid.uuid4)
+        else:
+            rows = list(queryset.order_by('?')[:n])
+        random.shuffle(rows)
+        return rows
+
+    def get_random_rows_by_probe(self, queryset, n):
+        """ return up to n random entries by probing random integer primary keys in batches, retrying to skip gaps """
+        bounds = self.aggregate(lower=models.Min('pk'), upper=models.Max('pk'))
+        if bounds['lower'] is None or n < 1:
+            return []
+        lower, upper = bounds['lower'], bounds['upper']
+        span = upper - lower + 1
+        found = {}
+        for _ in range(self.random_probe_rounds):
+            needed = n - len(found)
+            if needed <= 0:
+                break
+            candidates = random.sample(range(lower, upper + 1), min(span, needed * 4))
+            hits = list(queryset.filter(pk__in=candidates))
+            for obj in random.sample(hits, min(needed, len(hits))):
+                found[obj.pk] = obj
+            if len(candidates) == span:
+                # every primary key was probed; there are no more entries to find
+                return list(found.values())
+        return self.get_random_rows_by_seek(queryset, n, found, lambda: random.randint(lower, upper))
+
+    def get_random_rows_by_seek(self, queryset, n, found, get_random_key):
+        """ add entries to found (dict keyed by pk) by seeking the next entry after random primary keys until n entries
+        are found or the queryset is exhausted; return the list of found entries """
+        while len(found) < n:
+            key = get_random_key()
+            remaining = queryset.exclude(pk__in=list(found))
+            obj = remaining.filter(pk__gte=key).order_by('pk').first() or \
+                remaining.filter(pk__lt=key).order_by('-pk').first()
+            if obj is None:
+                break
+            found[obj.pk] = obj
+        return list(found.values())
+
+    def get_random_rows_by_tablesample(self, queryset, n):
+        """ return up to n random entries from a TABLESAMPLE of the table (PostgreSQL) """
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [self.model._meta.db_table])
+            row = cursor.fetchone()
+        estimate = row[0] if row and row[0] and row[0] > 0 else 0
+        rows = []
+        if estimate:
+            # oversample to allow for filtered entries and block-level clustering
+            sample, _ = get_sample_queryset(queryset, min(1.0, n * 10.0 / estimate))
+            rows = list(sample.order_by('?')[:n])
+        if len(rows) < n:
+            rows += list(queryset.exclude(pk__in=[i.pk for i in rows]).order_by('?')[:n - len(rows)])
+        return rows
+
+
+def get_child_relations(model):
+    """ return the one-to-one relations from a model to the models inherited from it """
+    registry = MODEL_INTROSPECTION_REGISTRY.setdefault(model, {})
+    if 'child_relations' not in registry:
+        registry['child_relations'] = tuple(f for f in model._meta.get_fields()
+                                            if getattr(f, 'field_name', None) and f.one_to_one)
+    return registry['child_relations']
+
+
+def resolve_children(queryset, depth=1):
+    """ resolve the children (and, with depth=2, grandchildren) of parent objects in bulk, so get_child() and
+    get_grandchild() do not issue a query per parent.
+
+    An unevaluated queryset is returned with the child relations added to select_related (one joined query). A list
+    (or evaluated queryset) of parent objects is resolved with one query per child model and returned; child models
+    are only queried for the parents whose stored child type (see ParentModelMixin.child_type_field) requires it. """
+    if isinstance(queryset, models.QuerySet) and queryset._result_cache is None:
+        paths = []
+        prefixes = [('', queryset.model)]
+        for _ in range(depth):
+            level = []
+            for prefix, model in prefixes:
+                for rel in get_child_relations(model):
+                    path = prefix + rel.get_accessor_name()
+                    paths.append(path)
+                    level.append((path + '__', rel.related_model))
+            prefixes = level
+        return queryset.select_related(*paths) if paths else queryset
+
+    parents = list(queryset)
+    by_model = {}
+    for parent in parents:
+        by_model.setdefault(type(parent), []).append(parent)
+    for model, instances in by_model.items():
+        children = []
+        for rel in get_child_relations(model):
+            pending = [i for i in instances if not rel.is_cached(i)]
+            if not pending:
+                continue
+            wanted = [i for i in pending if i.get_stored_child_model() is None
+                      or i.get_child_model() is rel.related_model] if issubclass(model, ParentModelMixin) else pending
+            found = rel.related_model._base_manager.using(pending[0]._state.db) \
+                .in_bulk([i.pk for i in wanted]) if wanted else {}
+            for instance in pending:
+                child = found.get(instance.pk)
+                rel.set_cached_value(instance, child)
+                if child is not None:
+                    rel.remote_field.set_cached_value(child, instance)
+                    children.append(child)
+        if depth > 1 and children:
+            resolve_children(children, depth - 1)
+    return parents
 
 
 class ParentModelMixin(object):
-    """ methods for parent models """
+    """ methods for parent models
+
+    class parameters:
+        child_type_field - optional name of a CharField on the parent model storing the label (app_label.modelname) of
+                           the most derived model each row was saved as; set on save() and used by get_child() and
+                           get_grandchild() to fetch the child with a single query. Rows created before the field
+                           was added keep an empty value and fall back to trying each child relation.
+
+    example usage:
+        class Animal(ParentModelMixin, HandyHelperBaseModel):
+            child_type = models.CharField(max_length=100, blank=True, editable=False)
+            child_type_field = 'child_type'
+    """
+    child_type_field = None
+
+    def save(self, *args, **kwargs):
+        if self.child_type_field:
+            stored = self.get_stored_child_model()
+            if (stored is None and self._state.adding) or stored in self._meta.get_parent_list():
+                setattr(self, self.child_type_field, self._meta.label_lower)
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = set(kwargs['update_fields']) | {self.child_type_field}
+        super(ParentModelMixin, self).save(*args, **kwargs)
+
+    def get_stored_child_model(self):
+        """ return the most derived model stored in child_type_field; None if not available """
+        label = getattr(self, self.child_type_field, None) if self.child_type_field else None
+        if not label:
+            return None
+        try:
+            return apps.get_model(label)
+        except (LookupError, ValueError):
+            return None
+
+    def get_child_model(self):
+        """ return the child model this object instance was saved as according to child_type_field; None if this
+        is not known or the object is not a parent of the stored model """
+        stored = self.get_stored_child_model()
+        model = self._meta.concrete_model
+        if stored is None or model not in stored._meta.get_parent_list():
+            return None
+        for i in [stored] + stored._meta.get_parent_list():
+            if model in i._meta.parents:
+                return i
+        return None
 
     def get_child_list(self):
         """ return a list of child objects """
-        return [f.get_accessor_name() for f in self._meta.get_fields()
-                if getattr(f, 'field_name', None) and f.one_to_one]
+        return [f.get_accessor_name() for f in get_child_relations(type(self))]
 
     def get_child(self):
         """ return the child inherited from this parent object instance """
+        child_model = self.get_child_model()
+        if child_model is not None:
+            return getattr(self, child_model._meta.parents[self._meta.concrete_model].remote_field.get_accessor_name(),
+                           None)
+        if self.get_stored_child_model() is not None:
+            return None
         for i in self.get_child_list():
             child = getattr(self, i, None)
             if child:
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=128)),
+                ('field_name', models.CharField(max_length=64)),
+                ('dimension', models.CharField(blank=True, default='', max_length=64)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('model_label', 'field_name', 'dimension')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Rollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(help_text='label of the rolled up model (app_label.ModelName)', max_length=128)),
+                ('field_name', models.CharField(help_text='datetime field the rows are bucketed by', max_length=64)),
+                ('dimension', models.CharField(blank=True, default='', help_text='dimension field; blank for totals', max_length=64)),
+                ('value', models.CharField(blank=True, default='', help_text='value of the dimension field', max_length=255)),
+                ('bucket', models.DateTimeField(help_text='start of the hour bucket')),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('model_label', 'field_name', 'dimension', 'value', 'bucket')},
+                'index_together': {('model_label', 'field_name', 'dimension', 'bucket')},
+            },
+        ),
+    ]
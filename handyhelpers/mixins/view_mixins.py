@@ -1,13 +1,24 @@
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from handyhelpers.querysets import get_queryset_validators
+from handyhelpers.search import search
+
 
 class FilterByQueryParamsMixin:
     """ Mixin used to evaluate query parameters provided in the URL and update a queryset accordingly. This is typically
-    used on list views. Query parameters passed must be valid model fields. Invalid parameters are ignored.
+    used on list views. Query parameters passed must be valid model fields. Invalid parameters are ignored. Field
+    lookups registered by handyhelpers can be used (ex. ?status__ne=closed, ?name__prefix=web).
 
     class parameters:
         request          - request object
         queryset         - django queryset
         page_description - optional parameter used to describe page; typically used as a page subtitle
         distinct         - optional parameter to make queryset include only distinct results
+        search_fields    - optional list of fields searched by the q query parameter; defaults to the fields declared
+                           for the model in SEARCH_DEFINITIONS (see handyhelpers.search)
 
     example usage:
         class HandyHelperGenericBaseListView(FilterByQueryParamsMixin, ListView)
@@ -16,6 +27,7 @@ class FilterByQueryParamsMixin:
     request = None
     queryset = None
     page_description = None
+    search_fields = None
 
     def filter_by_query_params(self):
         """
@@ -41,6 +53,42 @@ class FilterByQueryParamsMixin:
                 if val == 'None':
                     val = None
                 filter_dict[field] = val
+        queryset = self.queryset.filter(**filter_dict)
+        if self.request.GET.get('q'):
+            queryset = search(queryset, self.request.GET['q'], self.search_fields)
         if 'distinct' in self.request.GET.dict():
-            return self.queryset.filter(**filter_dict).distinct()
-        return self.queryset.filter(**filter_dict)
+            return queryset.distinct()
+        return queryset
+
+
+class ConditionalListMixin:
+    """ Mixin used to answer conditional GET requests on list views. A cheap validator (max of last_modified_field, row
+    count and max primary key) is computed for the filtered queryset before the page is rendered; if the client's
+    If-None-Match header still matches, a 304 Not Modified response is returned without running the main query or
+    rendering the template. ETag and Last-Modified headers are set on full responses. The ETag is the only validator:
+    deleting a row does not change the last modified time, so If-Modified-Since requests get a full response.
+
+    class parameters:
+        last_modified_field - datetime field used as the last modified time; defaults to: updated_at
+
+    example usage:
+        class ListProjects(ConditionalListMixin, HandyHelperListView)
+    """
+    last_modified_field = 'updated_at'
+
+    def get_validators(self):
+        """ return a quoted etag and last modified timestamp for the filtered queryset """
+        etag, last_modified = get_queryset_validators(
+            self.filter_by_query_params(), self.last_modified_field,
+            extra='{}|{}'.format(self.request.get_full_path(), getattr(self.request.user, 'pk', None)))
+        return quote_etag(etag), timegm(last_modified.utctimetuple()) if last_modified else None
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if last_modified and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(last_modified)
+            response.setdefault('ETag', etag)
+        return response
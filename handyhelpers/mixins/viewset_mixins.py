@@ -1,7 +1,19 @@
+from calendar import timegm
+
 from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
 from rest_framework_filters.filters import RelatedFilter
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.http import JsonResponse
 from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from handyhelpers.querysets import get_queryset_validators
 
 
 class InvalidLookupMixin:
@@ -110,3 +122,226 @@ class InvalidLookupMixin:
                                         status=status.HTTP_404_NOT_FOUND)
 
         return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalListViewSetMixin:
+    """ A mixin for Django Rest Framework viewsets to answer conditional GET requests on the list action. A cheap
+    validator (max of last_modified_field, row count and max primary key) is computed for the filtered queryset before
+    the list is fetched; if the client's If-None-Match header still matches, a 304 Not Modified response is returned
+    without running the main query or serializing. ETag and Last-Modified headers are set on full responses. The ETag
+    is the only validator: deleting a row does not change the last modified time, so If-Modified-Since requests get a
+    full response.
+
+    class parameters:
+        last_modified_field - datetime field used as the last modified time; defaults to: updated_at
+
+    example usage:
+        class MyModelViewSet(ConditionalListViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    last_modified_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = get_queryset_validators(
+            self.filter_queryset(self.get_queryset()), self.last_modified_field,
+            extra='{}|{}'.format(request.get_full_path(), getattr(request.user, 'pk', None)))
+        etag = quote_etag(etag)
+        last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            if last_modified and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(last_modified)
+            response.setdefault('ETag', etag)
+        return response
+
+
+class PrefetchedRelatedQueryset:
+    """ stand-in for the queryset of a PrimaryKeyRelatedField, serving get(pk=...) from objects loaded with in_bulk """
+
+    def __init__(self, model, objects):
+        self.model = model
+        self.objects = objects
+
+    def get(self, pk=None, **kwargs):
+        try:
+            return self.objects[self.model._meta.pk.to_python(pk)]
+        except ValidationError:
+            raise ValueError(pk)
+        except (KeyError, TypeError):
+            raise self.model.DoesNotExist
+
+
+class BulkViewSetMixin:
+    """ A mixin for Django Rest Framework viewsets that adds a 'bulk' endpoint (<prefix>/bulk/) to create, update and
+    delete many objects per request. Items are validated in batches of bulk_batch_size and, when every item is valid,
+    written inside a single transaction using bulk_create, bulk_update and set-based deletes. Related objects given by
+    primary key are loaded with one query per relation and batch. If any item is invalid (including primary keys
+    that are malformed or not found) nothing is written and the errors are returned per item (by position in the
+    submitted array).
+
+        POST         - array of objects to create
+        PUT / PATCH  - array of objects to update; each object must include the primary key
+        DELETE       - array of primary keys (or objects including the primary key) to delete
+
+    Many-to-many values are not written by bulk operations.
+
+    class parameters:
+        bulk_batch_size - number of items validated and written per batch; defaults to 500
+
+    example usage:
+        class MyModelViewSet(BulkViewSetMixin, viewsets.ModelViewSet):
+    """
+    bulk_batch_size = 500
+
+    def get_bulk_batches(self, items):
+        """ yield (offset, batch) tuples of items, bulk_batch_size items at a time """
+        for offset in range(0, len(items), self.bulk_batch_size):
+            yield offset, items[offset:offset + self.bulk_batch_size]
+
+    @staticmethod
+    def get_pk_value(item, pk_name):
+        """ return the primary key from an item that is either a primary key or a dictionary including one """
+        if isinstance(item, dict):
+            return item.get(pk_name, item.get('pk'))
+        return item
+
+    @staticmethod
+    def to_pk(model, value):
+        """ return a primary key value converted to the type of the model's primary key; None if invalid """
+        try:
+            return model._meta.pk.to_python(value)
+        except (ValidationError, TypeError):
+            return None
+
+    @staticmethod
+    def get_related_fields(serializer):
+        """ return a dictionary of {field name: PrimaryKeyRelatedField} of the writable relations of a serializer """
+        fields = {}
+        for name, field in serializer.fields.items():
+            relation = field.child_relation if isinstance(field, ManyRelatedField) else field
+            if isinstance(relation, PrimaryKeyRelatedField) and not field.read_only and relation.pk_field is None:
+                fields[name] = relation
+        return fields
+
+    def get_related_querysets(self, serializer, batch):
+        """ return a dictionary of {field name: PrefetchedRelatedQueryset} holding the related objects referenced by a
+        batch of items, loaded with one in_bulk query per relation """
+        querysets = {}
+        for name, relation in self.get_related_fields(serializer).items():
+            queryset = relation.get_queryset()
+            values = set()
+            for item in batch:
+                value = item.get(name) if isinstance(item, dict) else None
+                for i in value if isinstance(value, list) else [value]:
+                    pk = self.to_pk(queryset.model, i) if isinstance(i, (str, int)) else None
+                    if pk is not None:
+                        values.add(pk)
+            querysets[name] = PrefetchedRelatedQueryset(queryset.model, queryset.in_bulk(values) if values else {})
+        return querysets
+
+    def set_related_querysets(self, serializer, querysets):
+        """ serve the relations of a serializer from the objects loaded by get_related_querysets """
+        related_fields = self.get_related_fields(serializer)
+        for name, queryset in querysets.items():
+            related_fields[name].queryset = queryset
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'])
+    def bulk(self, request, *args, **kwargs):
+        """ route a bulk request to the create, update or delete handler """
+        if not isinstance(request.data, list):
+            return Response(data={'detail': 'expected a list of items'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.method == 'POST':
+            return self.bulk_create(request.data)
+        if request.method == 'DELETE':
+            return self.bulk_destroy(request.data)
+        return self.bulk_update(request.data, partial=request.method == 'PATCH')
+
+    def bulk_create(self, items):
+        """ validate items in batches and insert them with bulk_create """
+        model = self.get_queryset().model
+        m2m_names = [i.name for i in model._meta.many_to_many]
+        errors = []
+        objs = []
+        for offset, batch in self.get_bulk_batches(items):
+            serializer = self.get_serializer(data=batch, many=True)
+            self.set_related_querysets(serializer.child, self.get_related_querysets(serializer.child, batch))
+            if not serializer.is_valid():
+                errors += [{'index': offset + i, 'errors': e} for i, e in enumerate(serializer.errors) if e]
+                continue
+            for data in serializer.validated_data:
+                objs.append(model(**{k: v for k, v in data.items() if k not in m2m_names}))
+        if errors:
+            return Response(data={'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            model._default_manager.bulk_create(objs, batch_size=self.bulk_batch_size)
+        return Response(data={'created': len(objs)}, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, items, partial=False):
+        """ validate items in batches against their existing rows and write them with bulk_update """
+        queryset = self.get_queryset()
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        m2m_names = [i.name for i in model._meta.many_to_many]
+        errors = []
+        objs = []
+        update_fields = set()
+        for offset, batch in self.get_bulk_batches(items):
+            pk_list = [self.to_pk(model, self.get_pk_value(i, pk_name)) if isinstance(i, dict) else None for i in batch]
+            instances = queryset.in_bulk([i for i in pk_list if i is not None])
+            related_querysets = self.get_related_querysets(self.get_serializer(), batch)
+            for index, (item, pk) in enumerate(zip(batch, pk_list), start=offset):
+                instance = instances.get(pk) if pk is not None else None
+                if instance is None:
+                    errors.append({'index': index, 'errors': {'detail': 'not found'}})
+                    continue
+                serializer = self.get_serializer(instance, data=item, partial=partial)
+                self.set_related_querysets(serializer, related_querysets)
+                if not serializer.is_valid():
+                    errors.append({'index': index, 'errors': serializer.errors})
+                    continue
+                for field, value in serializer.validated_data.items():
+                    if field in m2m_names:
+                        continue
+                    setattr(instance, field, value)
+                    update_fields.add(field)
+                objs.append(instance)
+        if errors:
+            return Response(data={'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # bulk_update does not call pre_save(); refresh auto_now fields (such as updated_at) explicitly
+        now = timezone.now()
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for obj in objs:
+                    setattr(obj, field.attname, now)
+                update_fields.add(field.name)
+        update_fields.discard(pk_name)
+
+        with transaction.atomic():
+            if objs and update_fields:
+                model._default_manager.bulk_update(objs, list(update_fields), batch_size=self.bulk_batch_size)
+        return Response(data={'updated': len(objs)}, status=status.HTTP_200_OK)
+
+    def bulk_destroy(self, items):
+        """ check that every primary key exists, then delete the rows with one set-based delete per batch """
+        queryset = self.get_queryset()
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        errors = []
+        pk_batches = []
+        for offset, batch in self.get_bulk_batches(items):
+            pk_list = [self.to_pk(model, self.get_pk_value(i, pk_name)) for i in batch]
+            existing = set(queryset.filter(pk__in=[i for i in pk_list if i is not None]).values_list('pk', flat=True))
+            for index, pk in enumerate(pk_list, start=offset):
+                if pk is None:
+                    errors.append({'index': index, 'errors': {'detail': 'invalid primary key'}})
+                elif pk not in existing:
+                    errors.append({'index': index, 'errors': {'detail': 'not found'}})
+            pk_batches.append(existing)
+        if errors:
+            return Response(data={'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        deleted = 0
+        with transaction.atomic():
+            for pk_list in pk_batches:
+                deleted += model._default_manager.filter(pk__in=pk_list).delete()[1].get(model._meta.label, 0)
+        return Response(data={'deleted': deleted}, status=status.HTTP_200_OK)
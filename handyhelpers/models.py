@@ -3,9 +3,16 @@ Description:
 """
 
 # system modules
+import copy
+import time
+import uuid
 
 # django modules
-from django.db import models
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import models, transaction
 from django.db.utils import IntegrityError
 
 # model managers
@@ -13,23 +20,111 @@ from handyhelpers.managers import HandyHelperModelManager
 
 
 class HandyHelperBaseModel(models.Model):
-    """ abstract model for common fields in models (these fields will appear in all models) """
+    """ abstract model for common fields in models (these fields will appear in all models)
+
+    Field values are snapshotted when an instance is loaded from (or saved to) the database. save() writes only the
+    fields changed since then (plus updated_at) and skips the write, including signals, if nothing changed; if the
+    row no longer exists, it is inserted with every field as a plain save() would. In-place changes to mutable values
+    (such as a dict) are not detected; pass update_fields to save() to force a write.
+    """
     objects = HandyHelperModelManager()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # (attnames, values) snapshot of the loaded field values; attnames is shared by all instances loaded by a query
+    _loaded_values = None
+
+    # names of the fields written by the UPDATE of the current save(); None to write every field
+    _changed_fields = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(HandyHelperBaseModel, cls).from_db(db, field_names, values)
+        instance._loaded_values = (field_names, values)
+        return instance
+
+    def take_snapshot(self, fields=None):
+        """ record the current values of loaded fields (or only of the given field names) as unchanged """
+        if fields is None or self._loaded_values is None:
+            attnames = [i.attname for i in self._meta.concrete_fields if i.attname in self.__dict__]
+            self._loaded_values = (attnames, [self.__dict__[i] for i in attnames])
+            return
+        snapshot = dict(zip(*self._loaded_values))
+        for field in self._meta.concrete_fields:
+            if (field.name in fields or field.attname in fields) and field.attname in self.__dict__:
+                snapshot[field.attname] = self.__dict__[field.attname]
+        self._loaded_values = (list(snapshot), list(snapshot.values()))
+
+    def get_dirty_fields(self):
+        """ return a dictionary of {field name: loaded value} of the fields changed since the instance was loaded or
+        saved; empty if the instance has not been loaded from or saved to the database """
+        if self._loaded_values is None:
+            return {}
+        snapshot = dict(zip(*self._loaded_values))
+        dirty = {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:
+                continue
+            if field.attname not in snapshot or snapshot[field.attname] != self.__dict__[field.attname]:
+                dirty[field.name] = snapshot.get(field.attname)
+        return dirty
+
+    def save(self, *args, **kwargs):
+        if self._loaded_values is not None and not self._state.adding and not args and \
+                kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            if self._meta.pk.name not in dirty:
+                self._changed_fields = set(dirty).union(i.name for i in self._meta.concrete_fields
+                                                        if getattr(i, 'auto_now', False))
+        try:
+            super(HandyHelperBaseModel, self).save(*args, **kwargs)
+        finally:
+            changed_fields, self._changed_fields = self._changed_fields, None
+        self.take_snapshot(kwargs.get('update_fields') or changed_fields)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # update_fields is left unset for changed fields, so a row deleted since it was loaded is inserted again
+        if self._changed_fields is not None:
+            values = [i for i in values if i[0].name in self._changed_fields]
+        return super(HandyHelperBaseModel, self)._do_update(base_qs, using, pk_val, values, update_fields,
+                                                            forced_update)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super(HandyHelperBaseModel, self).refresh_from_db(using=using, fields=fields)
+        self.take_snapshot(fields)
+
     def update(self, **kwargs):
-        """ perform an 'update like' operation on a single model instance """
+        """ perform an 'update like' operation on a single model instance; only the provided fields (and updated_at)
+        are written, unless an attribute that is not a concrete field is provided """
         for i in kwargs:
             setattr(self, i, kwargs[i])
-        self.save()
+        field_names = {j for i in self._meta.concrete_fields if not i.primary_key for j in (i.name, i.attname)}
+        if self._state.adding or self.pk is None or not set(kwargs).issubset(field_names):
+            self.save()
+            return
+        update_fields = set(kwargs)
+        update_fields.update(i.name for i in self._meta.concrete_fields if getattr(i, 'auto_now', False))
+        self.save(update_fields=update_fields)
 
     class Meta:
         abstract = True
 
 
+# per-process copies of singleton rows loaded by SingletonModel.load(); {model: (object, version, checked at)}
+SINGLETON_CACHE = {}
+
+
 class SingletonModel(models.Model):
-    """ Singleton model to restrict a database table to one row. """
+    """ Singleton model to restrict a database table to one row.
+
+    load() keeps a per-process copy of the row and revalidates it against a version key in the cache framework; the
+    version check is skipped for SINGLETON_CACHE_TTL seconds (settings; defaults to 0) after the last check. save()
+    invalidates the copy in every process once the transaction commits; this requires a cache backend shared by all
+    processes (such as memcached or redis), so the copy is only kept when the default cache is not a local-memory or
+    dummy cache, unless SINGLETON_CACHE_ENABLED (settings) is set to True or False.
+    """
     class Meta:
         abstract = True
 
@@ -37,13 +132,80 @@ class SingletonModel(models.Model):
         try:
             self.pk = 1
             super(SingletonModel, self).save(*args, **kwargs)
+            SINGLETON_CACHE.pop(type(self), None)
+            transaction.on_commit(type(self).invalidate_cache)
         except IntegrityError:
             pass
 
     def delete(self, *args, **kwargs):
         pass
 
+    @classmethod
+    def get_cache_key(cls):
+        """ return the cache framework key holding the version of the singleton row """
+        return 'handyhelpers:singleton:{}'.format(cls._meta.label_lower)
+
+    @classmethod
+    def invalidate_cache(cls):
+        """ discard cached copies of the singleton row in every process """
+        SINGLETON_CACHE.pop(cls, None)
+        cache.set(cls.get_cache_key(), uuid.uuid4().hex, None)
+
+    @classmethod
+    def is_cache_enabled(cls):
+        """ return True if load() keeps a per-process copy of the row """
+        enabled = getattr(settings, 'SINGLETON_CACHE_ENABLED', None)
+        if enabled is None:
+            return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+        return enabled
+
     @classmethod
     def load(cls):
+        if not cls.is_cache_enabled():
+            return cls.objects.get_or_create(pk=1)[0]
+        now = time.monotonic()
+        entry = SINGLETON_CACHE.get(cls)
+        if entry and now - entry[2] < getattr(settings, 'SINGLETON_CACHE_TTL', 0):
+            return copy.deepcopy(entry[0])
+        version = cache.get(cls.get_cache_key())
+        if entry and version is not None and version == entry[1]:
+            SINGLETON_CACHE[cls] = (entry[0], version, now)
+            return copy.deepcopy(entry[0])
         obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        if version is None:
+            cache.add(cls.get_cache_key(), uuid.uuid4().hex, None)
+            version = cache.get(cls.get_cache_key())
+        SINGLETON_CACHE[cls] = (obj, version, now)
+        return copy.deepcopy(obj)
+
+
+class Rollup(models.Model):
+    """ pre-aggregated count of a model's rows per hour bucket, optionally per value of a dimension field """
+    model_label = models.CharField(max_length=128, help_text='label of the rolled up model (app_label.ModelName)')
+    field_name = models.CharField(max_length=64, help_text='datetime field the rows are bucketed by')
+    dimension = models.CharField(max_length=64, blank=True, default='', help_text='dimension field; blank for totals')
+    value = models.CharField(max_length=255, blank=True, default='', help_text='value of the dimension field')
+    bucket = models.DateTimeField(help_text='start of the hour bucket')
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('model_label', 'field_name', 'dimension', 'value', 'bucket'), )
+        index_together = (('model_label', 'field_name', 'dimension', 'bucket'), )
+
+    def __str__(self):
+        return '{} {} {}={} {}: {}'.format(self.model_label, self.field_name, self.dimension, self.value, self.bucket,
+                                           self.count)
+
+
+class RollupWatermark(models.Model):
+    """ last datetime (of field_name) aggregated into the rollups of a model and dimension """
+    model_label = models.CharField(max_length=128)
+    field_name = models.CharField(max_length=64)
+    dimension = models.CharField(max_length=64, blank=True, default='')
+    watermark = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = (('model_label', 'field_name', 'dimension'), )
+
+    def __str__(self):
+        return '{} {} {}: {}'.format(self.model_label, self.field_name, self.dimension, self.watermark)
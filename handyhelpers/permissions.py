@@ -10,6 +10,14 @@ How to use:
             permission_dict = {'POST': ['superusers'],
                                'GET': ['operators'] }
 
+    To restrict the rows of a view's queryset to the groups of the requesting user, add GroupScopedQuerysetMixin and
+    define the lookup path from the model to auth.Group in group_scope_field.
+    Example:
+
+        class MyListView(GroupScopedQuerysetMixin, HandyHelperListView):
+            queryset = Project.objects.all()
+            group_scope_field = 'team__groups'
+
 """
 
 from django.core.exceptions import PermissionDenied
@@ -17,6 +25,8 @@ from django.contrib.auth.views import redirect_to_login
 from django.conf import settings
 from django.contrib.auth import REDIRECT_FIELD_NAME
 
+from handyhelpers.querysets import filter_by_group_scope
+
 
 class MethodGroupPermissionBase(object):
     """ Base class for method group permissions """
@@ -73,3 +83,31 @@ class InAnyGroup(MethodGroupPermissionBase):
         permission_dict_mapping = getattr(self, 'permission_dict', {})
         permission_dict = permission_dict_mapping.get(request.method, [])
         return any(group in [i.name for i in request.user.groups.all()] for group in permission_dict)
+
+
+class GroupScopedQuerysetMixin(object):
+    """
+    Description:
+        Restrict the rows of a view's queryset to those owned by any of the user's groups. The restriction is applied in
+        the database by filtering the lookup path defined in group_scope_field on the user's groups.
+
+    Usage:
+        add as mixin to class definition and put the following in your view:
+            queryset = Project.objects.all()
+            group_scope_field = 'team__groups'
+            group_scope_superuser_bypass = True   (optional; superusers see all rows; defaults to True)
+    """
+    group_scope_field = None
+    group_scope_superuser_bypass = True
+
+    def get_group_scoped_queryset(self, queryset):
+        """ return the queryset restricted to the groups of the requesting user """
+        if not self.group_scope_field or queryset is None:
+            return queryset
+        if self.group_scope_superuser_bypass and self.request.user.is_superuser:
+            return queryset
+        return filter_by_group_scope(queryset, self.request.user, self.group_scope_field)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.queryset = self.get_group_scoped_queryset(self.queryset)
+        return super(GroupScopedQuerysetMixin, self).dispatch(request, *args, **kwargs)
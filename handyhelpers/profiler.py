@@ -0,0 +1,258 @@
+"""
+Description:
+    Sampled request profiling. ProfilerMiddleware records, for a fraction of requests, the view class, total time,
+    database time, query count, template rendering time and response size, along with the time spent per SQL statement
+    shape, in an append-only SQLite file. The profiler_summary management command reports latency percentiles per view
+    and the SQL shapes taking the most time.
+
+How to use:
+    Add the middleware first in your settings, so its total time includes the other middleware, and optionally
+    configure it:
+
+        MIDDLEWARE = ['handyhelpers.profiler.ProfilerMiddleware', ...]
+        PROFILER_SAMPLE_RATE = 0.01                                # fraction of requests profiled; defaults to 0.01
+        PROFILER_DATABASE = '/var/lib/myproject/profiler.sqlite3'  # defaults to profiler.sqlite3 in BASE_DIR
+
+    Then report on the recorded requests:
+
+        python manage.py profiler_summary --hours 24
+
+    Template time is measured for Django templates; Template.render is only wrapped while a profiled request is in
+    progress, so requests that are not sampled render without the wrapper when no profiled request runs. The store is
+    written outside of the project databases, so it does not add to the measured database time; use profiler_summary
+    --prune_days to remove old entries.
+"""
+
+# import system modules
+import functools
+import logging
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+# import Django modules
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# profile of the request being handled by the current thread
+PROFILE = threading.local()
+
+# connections of the current thread to profiler stores ({path: connection}), and stores created by this process
+STORE_CONNECTIONS = threading.local()
+STORE_CREATED = set()
+STORE_LOCK = threading.Lock()
+
+# number of profiled requests in progress and the unwrapped Template.render, while it is wrapped
+TEMPLATE_PROFILING = {'requests': 0, 'render': None}
+TEMPLATE_LOCK = threading.Lock()
+
+STORE_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS requests (id INTEGER PRIMARY KEY, timestamp REAL, method TEXT, path TEXT, view TEXT, '
+    'status INTEGER, total_ms REAL, db_ms REAL, queries INTEGER, template_ms REAL, response_size INTEGER)',
+    'CREATE INDEX IF NOT EXISTS requests_timestamp ON requests (timestamp)',
+    'CREATE TABLE IF NOT EXISTS queries (request_id INTEGER, shape TEXT, count INTEGER, total_ms REAL)',
+    'CREATE INDEX IF NOT EXISTS queries_request_id ON queries (request_id)',
+)
+
+# literals and lists of placeholders replaced in SQL statement shapes
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_PLACEHOLDER_LISTS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+def get_store_path():
+    """ return the path of the profiler store (PROFILER_DATABASE setting) """
+    return getattr(settings, 'PROFILER_DATABASE',
+                   os.path.join(str(getattr(settings, 'BASE_DIR', os.getcwd())), 'profiler.sqlite3'))
+
+
+def connect(path=None):
+    """ return a connection to the profiler store; its tables are created on the first connection of the process """
+    path = path or get_store_path()
+    db = sqlite3.connect(path, timeout=5)
+    with STORE_LOCK:
+        if path not in STORE_CREATED:
+            db.execute('PRAGMA journal_mode=WAL')
+            for statement in STORE_SCHEMA:
+                db.execute(statement)
+            db.commit()
+            STORE_CREATED.add(path)
+    return db
+
+
+def get_store_connection(path=None):
+    """ return the connection of the current thread to the profiler store, opened on first use and kept open; it is
+    opened again if the store was removed """
+    path = path or get_store_path()
+    if not hasattr(STORE_CONNECTIONS, 'connections'):
+        STORE_CONNECTIONS.connections = {}
+    if path in STORE_CONNECTIONS.connections and not os.path.exists(path):
+        close_store_connection(path)
+    if path not in STORE_CONNECTIONS.connections:
+        STORE_CONNECTIONS.connections[path] = connect(path)
+    return STORE_CONNECTIONS.connections[path]
+
+
+def close_store_connection(path=None):
+    """ close the connection of the current thread to the profiler store, if open; the tables are checked again on
+    the next connection """
+    path = path or get_store_path()
+    db = getattr(STORE_CONNECTIONS, 'connections', {}).pop(path, None)
+    if db is not None:
+        db.close()
+    with STORE_LOCK:
+        STORE_CREATED.discard(path)
+
+
+def get_sql_shape(sql):
+    """ return a SQL statement with literals replaced by ? and lists of placeholders collapsed, so statements
+    differing only by their values share a shape """
+    shape = SQL_PLACEHOLDER_LISTS.sub('(...)', SQL_LITERALS.sub('?', sql))
+    return re.sub(r'\s+', ' ', shape).strip()
+
+
+def get_view_name(view_func):
+    """ return the dotted name of the class (or function) of a view """
+    view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    return '{}.{}'.format(getattr(view, '__module__', ''), getattr(view, '__qualname__', repr(view)))
+
+
+def percentile(sorted_values, pct):
+    """ return the nearest-rank percentile of a sorted list of values """
+    if not sorted_values:
+        return 0
+    index = max(int(math.ceil(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class RequestProfile:
+    """ measurements of a profiled request; also used as the database execute wrapper of the request """
+
+    def __init__(self):
+        self.view = None
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.shapes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.db_time += elapsed
+            self.queries += 1
+            shape = get_sql_shape(sql)
+            count, total = self.shapes.get(shape, (0, 0.0))
+            self.shapes[shape] = (count + 1, total + elapsed)
+
+    def save(self, path, request, response, total_time):
+        """ append the profile to the store, through the connection of the current thread """
+        size = None if response.streaming else len(response.content)
+        db = get_store_connection(path)
+        try:
+            with db:
+                request_id = db.execute(
+                    'INSERT INTO requests (timestamp, method, path, view, status, total_ms, db_ms, queries, '
+                    'template_ms, response_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [time.time(), request.method, request.path, self.view, response.status_code, total_time * 1000,
+                     self.db_time * 1000, self.queries, self.template_time * 1000, size]).lastrowid
+                db.executemany('INSERT INTO queries (request_id, shape, count, total_ms) VALUES (?, ?, ?, ?)',
+                               [(request_id, shape, count, elapsed * 1000)
+                                for shape, (count, elapsed) in self.shapes.items()])
+        except sqlite3.Error:
+            # reopen the store on the next request, in case it was moved or removed
+            close_store_connection(path)
+            raise
+
+
+def profile_render(render):
+    """ wrap Template.render to add the time of outermost renders to the profile of the current request """
+    @functools.wraps(render)
+    def wrapper(self, *args, **kwargs):
+        profile = getattr(PROFILE, 'current', None)
+        if profile is None or profile.template_depth:
+            return render(self, *args, **kwargs)
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_depth -= 1
+            profile.template_time += time.perf_counter() - start
+    return wrapper
+
+
+@contextmanager
+def profile_templates():
+    """ wrap Template.render with profile_render while the block runs; the wrapper is installed by the first
+    profiled request in progress and removed when the last one finishes """
+    with TEMPLATE_LOCK:
+        if not TEMPLATE_PROFILING['requests']:
+            TEMPLATE_PROFILING['render'] = Template.render
+            Template.render = profile_render(Template.render)
+        TEMPLATE_PROFILING['requests'] += 1
+    try:
+        yield
+    finally:
+        with TEMPLATE_LOCK:
+            TEMPLATE_PROFILING['requests'] -= 1
+            if not TEMPLATE_PROFILING['requests']:
+                Template.render = TEMPLATE_PROFILING['render']
+                TEMPLATE_PROFILING['render'] = None
+
+
+class ProfilerMiddleware:
+    """
+    Middleware recording the view class, total time, database time and queries, template time and response size of a
+    sampled fraction of requests in the profiler store (see the description of this module). The middleware is
+    disabled if PROFILER_SAMPLE_RATE is 0; a request is never failed by the profiler.
+
+    class parameters:
+        sample_rate - fraction of requests profiled; defaults to the PROFILER_SAMPLE_RATE setting (0.01)
+        path        - path of the profiler store; defaults to the PROFILER_DATABASE setting
+
+    example usage:
+        MIDDLEWARE = ['handyhelpers.profiler.ProfilerMiddleware', ...]
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0.01)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.path = get_store_path()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = PROFILE.current = RequestProfile()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(profile_templates())
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            PROFILE.current = None
+        try:
+            profile.save(self.path, request, response, time.perf_counter() - start)
+        except (sqlite3.Error, OSError) as err:
+            logger.warning('unable to save request profile: %s', err)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(PROFILE, 'current', None)
+        if profile is not None:
+            profile.view = get_view_name(view_func)
@@ -6,90 +6,682 @@ Description:
 
 # import system modules
 import datetime
-import collections
+import hashlib
+import math
+import pytz
+import random
 
 # import Django modules
-from django.db.models import Count
+from django.conf import settings
+from django.db import connections
+from django.db.models import (Aggregate, AutoField, BigIntegerField, Case, Count, DurationField, ExpressionWrapper, F,
+                              FloatField, IntegerField, Max, Min, Q, Sum, Value, When)
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Extract, Floor, Ln, Mod, Trunc
 from django.utils import timezone
 
+# import optional modules
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# intervals supported by count_by_interval and get_interval_buckets
+INTERVALS = ('minute', 'hour', 'day', 'week', 'month', 'quarter', 'year')
+
+
+class RawSubquery(RawSQL):
+    """ raw SQL subquery for the right-hand side of an __in lookup; RawSQL is wrapped in a second pair of parentheses
+    there, which turns the subquery into a scalar expression (only its first row is used) """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def filter_by_group_scope(queryset, user, field_name):
+    """
+    Description:
+        restrict a queryset to rows owned by any of the groups the user belongs to. The lookup path is filtered on the
+        ids of the user's groups (an IN subquery); distinct() is added only when the path crosses a many-to-many or
+        reverse relation, where a row owned by several of the user's groups would otherwise be returned once per
+        group.
+
+    Args:
+        queryset: django queryset
+        user: user object (typically request.user)
+        field_name: lookup path from the queryset model to auth.Group (string); ex. 'team__groups'
+
+    Returns:
+        filtered queryset; an empty queryset if the user is not authenticated
+    """
+    if not user or not user.is_authenticated:
+        return queryset.none()
+    model = queryset.model
+    multi_valued = False
+    for name in field_name.split(LOOKUP_SEP):
+        field = model._meta.get_field(name)
+        multi_valued = multi_valued or field.many_to_many or field.one_to_many
+        model = field.related_model
+    queryset = queryset.filter(**{'{}__in'.format(field_name): user.groups.values('pk')})
+    return queryset.distinct() if multi_valued else queryset
+
+
+def get_queryset_validators(queryset, field_name='updated_at', extra=None):
+    """
+    Description:
+        compute cheap cache validators for a queryset with a single aggregate query (max of field_name, row count and
+        max primary key) without fetching any rows. The etag changes whenever a row is added, deleted or updated; the
+        last modified time does not change when a row is deleted, so use the etag to answer conditional requests.
+
+    Args:
+        queryset: django queryset
+        field_name: last-modified datetime field (string); ignored if not a field of the queryset model
+        extra: optional string mixed into the etag, such as the request path or user id
+
+    Returns:
+        tuple of (etag, last_modified): unquoted etag string and last modified datetime (None if not available)
+    """
+    aggregates = {'count': Count('pk'), 'max_pk': Max('pk')}
+    if field_name and field_name in [i.name for i in queryset.model._meta.concrete_fields]:
+        aggregates['last_modified'] = Max(field_name)
+    data = queryset.order_by().aggregate(**aggregates)
+    last_modified = data.get('last_modified')
+    digest = hashlib.md5('{}|{}|{}|{}|{}'.format(queryset.model._meta.label, data['count'], data['max_pk'],
+                                                   last_modified.isoformat() if last_modified else '',
+                                                   extra or '').encode('utf-8'))
+    return digest.hexdigest(), last_modified
+
+
+def get_interval_tz(tz=None):
+    """ return the tzinfo used to bucket datetimes; None if USE_TZ is disabled """
+    if not settings.USE_TZ:
+        return None
+    if isinstance(tz, str):
+        return pytz.timezone(tz)
+    return tz or timezone.get_current_timezone()
+
+
+def truncate_datetime(value, interval):
+    """
+    Description:
+        truncate a (naive, wall-clock) datetime to the start of its interval
+
+    Args:
+        value: datetime
+        interval: one of INTERVALS (string)
+
+    Returns:
+        datetime of the start of the interval
+    """
+    if interval not in INTERVALS:
+        raise ValueError('interval must be one of {}'.format(INTERVALS))
+    value = value.replace(second=0, microsecond=0)
+    if interval == 'minute':
+        return value
+    value = value.replace(minute=0)
+    if interval == 'hour':
+        return value
+    value = value.replace(hour=0)
+    if interval == 'day':
+        return value
+    if interval == 'week':
+        return value - datetime.timedelta(days=value.weekday())
+    if interval == 'month':
+        return value.replace(day=1)
+    if interval == 'quarter':
+        return value.replace(month=(value.month - 1) // 3 * 3 + 1, day=1)
+    return value.replace(month=1, day=1)
+
+
+def shift_datetime(value, interval, periods):
+    """
+    Description:
+        shift a truncated (naive, wall-clock) datetime by a number of intervals
+
+    Args:
+        value: datetime truncated to interval
+        interval: one of INTERVALS (string)
+        periods: number of intervals to shift; negative values shift back in time (int)
+
+    Returns:
+        shifted datetime
+    """
+    if interval in ('minute', 'hour', 'day', 'week'):
+        return value + datetime.timedelta(**{'{}s'.format(interval): periods})
+    months = {'month': 1, 'quarter': 3, 'year': 12}[interval] * periods
+    total = value.year * 12 + value.month - 1 + months
+    return value.replace(year=total // 12, month=total % 12 + 1)
+
+
+def get_interval_buckets(interval, periods, tz=None, now=None):
+    """
+    Description:
+        build the bucket start times for the last number of periods of an interval
+
+    Args:
+        interval: one of INTERVALS (string)
+        periods: number of buckets (int)
+        tz: timezone (tzinfo or name) used to define bucket boundaries; defaults to the current timezone
+        now: datetime used as the current time; defaults to timezone.now()
+
+    Returns:
+        list of naive wall-clock bucket start datetimes, starting with the current bucket, descending chronologically
+    """
+    tz = get_interval_tz(tz)
+    now = now or timezone.now()
+    if tz and timezone.is_aware(now):
+        now = timezone.localtime(now, tz).replace(tzinfo=None)
+    current = truncate_datetime(now, interval)
+    return [shift_datetime(current, interval, -i) for i in range(periods)]
+
+
+def make_bucket_aware(value, tz):
+    """ return a naive wall-clock bucket start as an aware datetime in tz (unchanged if tz is None) """
+    if tz is None:
+        return value
+    return timezone.make_aware(value, tz, is_dst=False)
+
+
+def get_bucket_key(value, tz):
+    """ return the naive wall-clock datetime in tz for a bucket value returned by the database """
+    if tz is not None and timezone.is_aware(value):
+        return timezone.localtime(value, tz).replace(tzinfo=None)
+    return value
+
+
+def get_interval_range(interval, periods, tz=None):
+    """
+    Description:
+        resolve the timezone, bucket start times and datetime range covered by the last number of periods of an
+        interval
+
+    Args:
+        interval: one of INTERVALS (string)
+        periods: number of buckets (int)
+        tz: timezone (tzinfo or name) used to define bucket boundaries; defaults to the current timezone
+
+    Returns:
+        tuple of (tz, buckets, start, end): tzinfo (None if USE_TZ is disabled), list of naive wall-clock bucket
+        starts (descending chronologically), and the datetime range [start, end) covered by the buckets
+    """
+    tz = get_interval_tz(tz)
+    buckets = get_interval_buckets(interval, periods, tz)
+    if not buckets:
+        return tz, buckets, None, None
+    return (tz, buckets, make_bucket_aware(buckets[-1], tz),
+            make_bucket_aware(shift_datetime(buckets[0], interval, 1), tz))
+
+
+def count_by_interval(queryset, field_name, interval='hour', periods=24, tz=None):
+    """
+    Description:
+        count queryset entries per interval over the last number of periods using a single grouped query. Buckets are
+        truncated in the database with Trunc, are timezone-aware and work on every database backend. Intervals without
+        entries are returned as 0.
+
+    Args:
+        queryset: django queryset
+        field_name: datetime field to bucket entries by (string)
+        interval: one of 'minute', 'hour', 'day', 'week', 'month', 'quarter', 'year' (string)
+        periods: number of intervals to return (int)
+        tz: timezone (tzinfo or name) used to define bucket boundaries; defaults to the current timezone
+
+    Returns:
+        list of counts per interval, starting with current interval, descending chronologically
+    """
+    tz, buckets, start, end = get_interval_range(interval, periods, tz)
+    if not buckets:
+        return []
+    data = queryset.filter(**{'{}__gte'.format(field_name): start, '{}__lt'.format(field_name): end}) \
+        .annotate(bucket=Trunc(field_name, interval, tzinfo=tz)).values('bucket') \
+        .annotate(count=Count('pk')).order_by()
+    counts = {get_bucket_key(i['bucket'], tz): i['count'] for i in data}
+    return [counts.get(i, 0) for i in buckets]
+
+
+def count_by_interval_series(queryset, field_name, series, interval='hour', periods=24, tz=None, as_array=False):
+    """
+    Description:
+        count queryset entries per interval for several series with a single grouped query. Series can be defined by
+        a dimension field (GROUP BY bucket, field) or by a dictionary of named Q objects (conditional aggregation).
+        Intervals without entries are returned as 0.
+
+    Args:
+        queryset: django queryset
+        field_name: datetime field to bucket entries by (string)
+        series: dimension field name (string), or dictionary of {series name: Q object}
+        interval: one of 'minute', 'hour', 'day', 'week', 'month', 'quarter', 'year' (string)
+        periods: number of intervals to return (int)
+        tz: timezone (tzinfo or name) used to define bucket boundaries; defaults to the current timezone
+        as_array: return the counts as a 2-D NumPy array (series x interval) when NumPy is installed (bool)
+
+    Returns:
+        dictionary with 'labels' (ISO formatted bucket starts, current interval first, descending chronologically),
+        'series' (series names) and 'data' (list of count lists, one per series, aligned with labels)
+    """
+    tz, buckets, start, end = get_interval_range(interval, periods, tz)
+    queryset = queryset.filter(**{'{}__gte'.format(field_name): start, '{}__lt'.format(field_name): end}) \
+        .annotate(bucket=Trunc(field_name, interval, tzinfo=tz)).order_by()
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+
+    if isinstance(series, dict):
+        names = list(series.keys())
+        aggregates = {'series_{}'.format(i): Count('pk', filter=q if isinstance(q, Q) else Q(**q))
+                      for i, q in enumerate(series.values())}
+        data = [[0] * len(buckets) for _ in names]
+        for row in queryset.values('bucket').annotate(**aggregates):
+            position = index.get(get_bucket_key(row['bucket'], tz))
+            if position is None:
+                continue
+            for i in range(len(names)):
+                data[i][position] = row['series_{}'.format(i)]
+    else:
+        rows = list(queryset.values('bucket', series).annotate(count=Count('pk')))
+        names = sorted({row[series] for row in rows}, key=lambda x: (x is None, str(x)))
+        positions = {name: i for i, name in enumerate(names)}
+        data = [[0] * len(buckets) for _ in names]
+        for row in rows:
+            position = index.get(get_bucket_key(row['bucket'], tz))
+            if position is not None:
+                data[positions[row[series]]][position] = row['count']
+
+    if as_array and numpy is not None:
+        data = numpy.array(data, dtype=numpy.int64).reshape(len(names), len(buckets))
+    return {'labels': [i.isoformat() for i in buckets], 'series': names, 'data': data}
+
 
 def count_by_hour(queryset, field_name):
     """
-    sort queryset results by hour of day
+    Description:
+        count queryset entries per hour over the last 24 hours
 
     Args:
         queryset: django queryset
-        field_name: field to group data by (string)
+        field_name: datetime field to group data by (string)
 
     Returns:
         list of grouped values: count of entries per hour, starting with current hour, descending chronologically
     """
-    data = queryset.extra({'hour': "hour({})".format(field_name)}).values('hour').annotate(Count('id'))
-    new_dict = collections.OrderedDict()
-    for i in data:
-        values = i.values()
-        new_dict[values[0]] = values[1]
-
-    return_list = []
-    now = timezone.now()
-    for i in [(now - datetime.timedelta(hours=i)).hour for i in range(0, 24)]:
-        if i not in new_dict.keys():
-            return_list.append(0)
-        else:
-            return_list.append(new_dict[i])
-    return return_list
+    return count_by_interval(queryset, field_name, 'hour', 24)
 
 
 def count_by_week(queryset, field_name):
     """
     Description:
-        sort queryset results by week of year
+        count queryset entries per week over the last 52 weeks
 
     Args:
         queryset: django queryset
-        field_name: field to group data by (string)
+        field_name: datetime field to group data by (string)
 
     Returns:
-        list of grouped values
         list of grouped values: count of entries per week, starting with current week, descending chronologically
     """
-    data = queryset.extra({'week': "week({})".format(field_name)}).values('week').annotate(Count('id'))
-    new_dict = collections.OrderedDict()
-    for i in data:
-        new_dict[i['week']] = i['id__count']
-
-    return_list = []
-    now = timezone.now()
-    for i in [(now - datetime.timedelta(weeks=i)).isocalendar()[1] for i in range(0, 52)]:
-        if i not in new_dict.keys():
-            return_list.append(0)
-        else:
-            return_list.append(new_dict[i])
-    return return_list
+    return count_by_interval(queryset, field_name, 'week', 52)
 
 
 def count_by_month(queryset, field_name):
     """
     Description:
-        sort queryset results by month of year
+        count queryset entries per month over the last 12 months
 
     Args:
         queryset: django queryset
-        field_name: field to group data by (string)
+        field_name: datetime field to group data by (string)
 
     Returns:
         list of grouped values: count of entries per month, starting with current month, descending chronologically
     """
-    data = queryset.extra({'month': "month({})".format(field_name)}).values('month').annotate(Count('id'))
-    new_dict = collections.OrderedDict()
-    for i in data:
-        new_dict[i['month']] = i['id__count']
+    return count_by_interval(queryset, field_name, 'month', 12)
+
+
+class PercentileCont(Aggregate):
+    """ continuous percentile aggregate (PostgreSQL and Oracle); percentile is a fraction between 0 and 1 """
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def is_duration_field(queryset, field_name):
+    """ return True if field_name is a DurationField of the queryset model """
+    try:
+        return queryset.model._meta.get_field(field_name).get_internal_type() == 'DurationField'
+    except Exception:
+        return False
+
+
+def get_numeric_expression(queryset, field_name):
+    """ return an expression evaluating field_name as a number; durations are evaluated in microseconds """
+    if is_duration_field(queryset, field_name):
+        if connections[queryset.db].features.has_native_duration_field:
+            return ExpressionWrapper(Extract(field_name, 'epoch') * Value(1000000), output_field=FloatField())
+        return ExpressionWrapper(F(field_name), output_field=BigIntegerField())
+    return ExpressionWrapper(F(field_name), output_field=FloatField())
+
+
+def histogram(queryset, field_name, bins=10, lower=None, upper=None, log=False):
+    """
+    Description:
+        count queryset entries per bin of a numeric or duration field with a single grouped query; only the bin
+        counts are returned from the database. Bins are of fixed width, or of fixed width on a log scale if log is
+        True (non-positive values are then excluded). Values outside of [lower, upper] are excluded.
+
+    Args:
+        queryset: django queryset
+        field_name: numeric or duration field (string)
+        bins: number of bins (int)
+        lower: lower edge of the first bin; minimum value of field_name if not provided (one additional query)
+        upper: upper edge of the last bin; maximum value of field_name if not provided (one additional query)
+        log: use logarithmic bin widths (bool)
+
+    Returns:
+        dictionary with 'edges' (bins + 1 bin edges; timedeltas for duration fields) and 'counts' (entries per bin)
+    """
+    duration = is_duration_field(queryset, field_name)
+    queryset = queryset.annotate(histogram_value=get_numeric_expression(queryset, field_name)) \
+        .filter(histogram_value__isnull=False).order_by()
+    if log:
+        queryset = queryset.filter(histogram_value__gt=0)
+    if duration:
+        lower = lower.total_seconds() * 1000000 if isinstance(lower, datetime.timedelta) else lower
+        upper = upper.total_seconds() * 1000000 if isinstance(upper, datetime.timedelta) else upper
+    if lower is None or upper is None:
+        bounds = queryset.aggregate(lower=Min('histogram_value'), upper=Max('histogram_value'))
+        lower = bounds['lower'] if lower is None else lower
+        upper = bounds['upper'] if upper is None else upper
+    if lower is None or upper is None or upper < lower or (log and lower <= 0):
+        return {'edges': [], 'counts': []}
+    lower = float(lower)
+    upper = float(upper)
+
+    if log:
+        scaled, scaled_lower, scaled_upper = Ln('histogram_value'), math.log(lower), math.log(upper)
+        edges = [lower * (upper / lower) ** (i / float(bins)) for i in range(bins + 1)]
+    else:
+        scaled, scaled_lower, scaled_upper = F('histogram_value'), lower, upper
+        edges = [lower + (upper - lower) * i / float(bins) for i in range(bins + 1)]
+    width = (scaled_upper - scaled_lower) / bins or 1.0
+    bucket = Case(When(histogram_value__gte=upper, then=Value(bins - 1)),
+                  default=Floor((scaled - Value(scaled_lower)) / Value(width)), output_field=IntegerField())
+    data = queryset.filter(histogram_value__gte=lower, histogram_value__lte=upper) \
+        .annotate(histogram_bin=bucket).values('histogram_bin').annotate(count=Count('pk'))
+
+    counts = [0] * bins
+    for row in data:
+        counts[min(max(int(row['histogram_bin']), 0), bins - 1)] += row['count']
+    if duration:
+        edges = [datetime.timedelta(microseconds=i) for i in edges]
+    return {'edges': edges, 'counts': counts}
+
+
+def percentiles(queryset, field_name, percents=(50, 90, 99), sample_size=10000):
+    """
+    Description:
+        compute continuous percentiles of a numeric or duration field. PostgreSQL and Oracle compute exact values with
+        the native percentile_cont aggregate in a single query; other backends interpolate over the values of up to
+        sample_size rows, selected systematically by primary key (exact if the queryset has no more rows).
 
-    return_list = []
-    now = timezone.now()
-    for i in [(now - datetime.timedelta(i * 365 / 12)).month for i in range(0, 12)]:
-        if i not in new_dict.keys():
-            return_list.append(0)
+    Args:
+        queryset: django queryset
+        field_name: numeric or duration field (string)
+        percents: percentiles to compute, between 0 and 100 (list of numbers)
+        sample_size: maximum number of values fetched on backends without percentile_cont (int)
+
+    Returns:
+        dictionary of {percent: value}; values are None if the queryset is empty
+    """
+    duration = is_duration_field(queryset, field_name)
+    queryset = queryset.filter(**{'{}__isnull'.format(field_name): False}).order_by()
+    if connections[queryset.db].vendor in ('postgresql', 'oracle'):
+        output_field = DurationField() if duration else FloatField()
+        data = queryset.aggregate(**{'p{}'.format(i): PercentileCont(field_name, p / 100.0, output_field=output_field)
+                                     for i, p in enumerate(percents)})
+        return {p: data['p{}'.format(i)] for i, p in enumerate(percents)}
+
+    count = queryset.count()
+    if count > sample_size:
+        if isinstance(queryset.model._meta.pk, (AutoField, IntegerField)):
+            step = int(math.ceil(count / float(sample_size)))
+            queryset = queryset.annotate(sample_bucket=Mod('pk', step)).filter(sample_bucket=0)
         else:
-            return_list.append(new_dict[i])
-    return return_list
+            queryset = queryset.order_by('?')[:sample_size]
+    values = sorted(queryset.values_list(field_name, flat=True))
+    if not duration:
+        # interpolate decimals as floats, as returned by percentile_cont
+        values = [float(i) for i in values]
+
+    results = {}
+    for p in percents:
+        if not values:
+            results[p] = None
+            continue
+        position = (len(values) - 1) * p / 100.0
+        low = int(math.floor(position))
+        high = min(low + 1, len(values) - 1)
+        results[p] = values[low] + (values[high] - values[low]) * (position - low)
+    return results
+
+
+def get_sample_queryset(queryset, fraction=0.01, ranges=32):
+    """
+    Description:
+        restrict a queryset to a random sample of approximately fraction of the rows of its table. PostgreSQL samples
+        with TABLESAMPLE SYSTEM; other backends select random primary key ranges (one per stratum of the primary key
+        span) so the sample is read through the primary key index. Tables without an integer primary key, and tables
+        too small to sample, are not sampled.
+
+    Args:
+        queryset: django queryset
+        fraction: approximate fraction of rows to sample, between 0 and 1 (float)
+        ranges: number of primary key ranges to sample on backends without TABLESAMPLE (int)
+
+    Returns:
+        tuple of (sampled queryset, effective sampling fraction); fraction is 1.0 if the queryset was not sampled
+    """
+    if fraction >= 1:
+        return queryset, 1.0
+    connection = connections[queryset.db]
+    model = queryset.model
+    pk = model._meta.pk
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT {} FROM {} TABLESAMPLE SYSTEM (%s)'.format(connection.ops.quote_name(pk.column),
+                                                                 connection.ops.quote_name(model._meta.db_table))
+        return queryset.filter(pk__in=RawSubquery(sql, [fraction * 100])), fraction
+    if not isinstance(pk, (AutoField, IntegerField)):
+        return queryset, 1.0
+    bounds = model._default_manager.using(queryset.db).aggregate(lower=Min('pk'), upper=Max('pk'))
+    if bounds['lower'] is None:
+        return queryset, 1.0
+    span = bounds['upper'] - bounds['lower'] + 1
+    stratum = span / float(ranges)
+    width = int(span * fraction / ranges)
+    if width < 1 or width >= stratum:
+        return queryset, 1.0
+    condition = Q()
+    for i in range(ranges):
+        start = bounds['lower'] + int(i * stratum) + random.randint(0, int(stratum) - width)
+        condition |= Q(pk__gte=start, pk__lt=start + width)
+    return queryset.filter(condition), width * ranges / float(span)
+
+
+def get_ordering(queryset):
+    """
+    Description:
+        return the ordering a queryset is evaluated with: its order_by() lookups or, when it is not cleared, the
+        default ordering of the model (Meta.ordering)
+
+    Args:
+        queryset: django queryset
+
+    Returns:
+        list of field names (prefixed with '-' for descending order) and ordering expressions
+    """
+    query = queryset.query
+    if query.extra_order_by or query.order_by:
+        return list(query.extra_order_by or query.order_by)
+    if query.default_ordering:
+        return list(queryset.model._meta.ordering)
+    return []
+
+
+def iterate_in_chunks(queryset, chunk_size=1000, order='pk', values=None):
+    """
+    Description:
+        iterate over a queryset in chunks paged by a unique, non-null field (keyset pagination: WHERE order > last),
+        so each query reads chunk_size rows through the index of the field and memory use does not grow with the
+        size of the table. Unlike server-side cursors, this works through connection poolers such as PgBouncer.
+        select_related and prefetch_related lookups of the queryset are applied per chunk.
+
+    Args:
+        queryset: django queryset (its ordering is replaced by the order field)
+        chunk_size: number of rows per query (int)
+        order: unique field to page by; prefix with '-' for descending order (string)
+        values: optional list of field names; yields tuples of their values instead of model instances
+
+    Returns:
+        generator of model instances, or of tuples of values
+    """
+    descending = order.startswith('-')
+    field_name = order.lstrip('-')
+    lookup = '{}__{}'.format(field_name, 'lt' if descending else 'gt')
+    queryset = queryset.order_by(order)
+    if values is not None:
+        queryset = queryset.values_list(field_name, *values)
+    last = None
+    while True:
+        chunk = queryset.filter(**{lookup: last}) if last is not None else queryset
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        if values is not None:
+            last = chunk[-1][0]
+            for row in chunk:
+                yield row[1:]
+        else:
+            last = getattr(chunk[-1], field_name)
+            yield from chunk
+        if len(chunk) < chunk_size:
+            return
+
+
+def get_estimate(sample_count, fraction, z=1.96):
+    """
+    Description:
+        scale a count observed in a sample up to the full population
+
+    Args:
+        sample_count: count observed in the sample (int)
+        fraction: sampling fraction (float)
+        z: z-score of the confidence level of the margin; defaults to 95% (float)
+
+    Returns:
+        tuple of (estimate, margin): estimated count and margin of error (estimate +/- margin)
+    """
+    if fraction >= 1:
+        return sample_count, 0
+    if not sample_count:
+        # nothing observed; use the 'rule of three' upper bound of the 95% confidence interval
+        return 0, int(math.ceil(3 * (1 - fraction) / fraction))
+    return (int(round(sample_count / fraction)),
+            int(math.ceil(z * math.sqrt(sample_count * (1 - fraction)) / fraction)))
+
+
+def approx_count(queryset, fraction=0.01):
+    """
+    Description:
+        estimate the number of queryset entries from a random sample
+
+    Args:
+        queryset: django queryset
+        fraction: approximate fraction of rows to sample, between 0 and 1 (float)
+
+    Returns:
+        dictionary with 'estimate', 'margin' (95% margin of error), 'lower', 'upper' and 'fraction' (effective
+        sampling fraction); an empty sample gives an estimate of 0 with the upper bound of the count as margin
+    """
+    sample, fraction = get_sample_queryset(queryset, fraction)
+    estimate, margin = get_estimate(sample.count(), fraction)
+    return {'estimate': estimate, 'margin': margin, 'lower': max(estimate - margin, 0), 'upper': estimate + margin,
+            'fraction': fraction}
+
+
+def approx_distinct(queryset, field_names, fraction=0.01):
+    """
+    Description:
+        estimate the number of distinct values (or combinations of values) of fields in a queryset from a random
+        sample, using the Haas-Stokes (Duj1) estimator PostgreSQL uses for its n_distinct statistic
+
+    Args:
+        queryset: django queryset
+        field_names: list of field names
+        fraction: approximate fraction of rows to sample, between 0 and 1 (float)
+
+    Returns:
+        dictionary with 'estimate' (estimated number of distinct values), 'rows' (estimated number of entries) and
+        'fraction' (effective sampling fraction)
+    """
+    sample, fraction = get_sample_queryset(queryset, fraction)
+    stats = sample.values(*field_names).annotate(sample_rows=Count('pk')).order_by().aggregate(
+        distinct=Count('sample_rows'), singletons=Count(Case(When(sample_rows=1, then=1))), rows=Sum('sample_rows'))
+    sample_rows = stats['rows'] or 0
+    rows = get_estimate(sample_rows, fraction)[0]
+    if fraction >= 1 or not sample_rows:
+        return {'estimate': stats['distinct'], 'rows': rows, 'fraction': fraction}
+    distinct, singletons = stats['distinct'], stats['singletons']
+    estimate = sample_rows * distinct / (sample_rows - singletons + singletons * sample_rows / float(rows))
+    return {'estimate': int(round(min(max(estimate, distinct), rows))), 'rows': rows, 'fraction': fraction}
+
+
+def approx_count_by_interval(queryset, field_name, interval='hour', periods=24, tz=None, fraction=0.01):
+    """
+    Description:
+        estimate the count of queryset entries per interval from a random sample (see count_by_interval)
+
+    Args:
+        queryset: django queryset
+        field_name: datetime field to bucket entries by (string)
+        interval: one of 'minute', 'hour', 'day', 'week', 'month', 'quarter', 'year' (string)
+        periods: number of intervals to return (int)
+        tz: timezone (tzinfo or name) used to define bucket boundaries; defaults to the current timezone
+        fraction: approximate fraction of rows to sample, between 0 and 1 (float)
+
+    Returns:
+        dictionary with 'counts' (estimated counts per interval, starting with current interval, descending
+        chronologically), 'margins' (95% margin of error of each count) and 'fraction' (effective sampling fraction)
+    """
+    sample, fraction = get_sample_queryset(queryset, fraction)
+    estimates = [get_estimate(i, fraction) for i in count_by_interval(sample, field_name, interval, periods, tz)]
+    return {'counts': [i[0] for i in estimates], 'margins': [i[1] for i in estimates], 'fraction': fraction}
+
+
+def approx_count_by_interval_series(queryset, field_name, series, interval='hour', periods=24, tz=None,
+                                    fraction=0.01):
+    """
+    Description:
+        estimate the count of queryset entries per interval for several series from a random sample (see
+        count_by_interval_series)
+
+    Args:
+        queryset: django queryset
+        field_name: datetime field to bucket entries by (string)
+        series: dimension field name (string), or dictionary of {series name: Q object}
+        interval: one of 'minute', 'hour', 'day', 'week', 'month', 'quarter', 'year' (string)
+        periods: number of intervals to return (int)
+        tz: timezone (tzinfo or name) used to define bucket boundaries; defaults to the current timezone
+        fraction: approximate fraction of rows to sample, between 0 and 1 (float)
+
+    Returns:
+        dictionary with 'labels', 'series', 'data' (estimated counts), 'margins' (95% margin of error of each count)
+        and 'fraction' (effective sampling fraction)
+    """
+    sample, fraction = get_sample_queryset(queryset, fraction)
+    results = count_by_interval_series(sample, field_name, series, interval, periods, tz)
+    estimates = [[get_estimate(i, fraction) for i in row] for row in results['data']]
+    results['data'] = [[i[0] for i in row] for row in estimates]
+    results['margins'] = [[i[1] for i in row] for row in estimates]
+    results['fraction'] = fraction
+    return results
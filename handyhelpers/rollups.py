@@ -0,0 +1,145 @@
+"""
+Description:
+    Incremental rollups of time-series counts. update_rollup aggregates the rows of a model added since the last run
+    into hourly Rollup rows; count_by_interval_rollup reads those rollups and merges in the rows that have not been
+    rolled up yet (the live tail), so dashboard queries no longer scan the whole table.
+
+How to use:
+    Declare rollups in your settings and run the update_rollups management command periodically (cron, celery, etc.):
+
+        ROLLUP_DEFINITIONS = [{'model': 'myapp.Event', 'field': 'created_at', 'dimensions': ['status']}, ]
+
+    Read counts in your views:
+
+        count_by_interval_rollup(Event, 'created_at', interval='day', periods=30)
+        count_by_interval_rollup(Event, 'created_at', interval='day', periods=30, dimension='status')
+
+    Rollups are stored per hour (UTC); read intervals of an hour or longer in timezones with whole-hour offsets.
+"""
+
+# import system modules
+import datetime
+import pytz
+
+# import Django modules
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+# import handyhelpers modules
+from handyhelpers.models import Rollup, RollupWatermark
+from handyhelpers.querysets import get_interval_tz, get_interval_range, get_bucket_key
+
+# granularity rollups are stored at
+ROLLUP_INTERVAL = 'hour'
+
+
+def get_dimension_value(value):
+    """ return the string stored in Rollup.value for a dimension value """
+    return '' if value is None else str(value)
+
+
+def update_rollup(model, field_name='created_at', dimension=None, settle_seconds=60):
+    """
+    Description:
+        aggregate the rows of a model created since the last watermark into hourly rollups. Rows newer than
+        settle_seconds are left for the next run to allow in-flight transactions to commit.
+
+    Args:
+        model: django model
+        field_name: datetime field to bucket rows by (string)
+        dimension: optional field to count rows per value of (string)
+        settle_seconds: age, in seconds, a row must reach before it is rolled up (int)
+
+    Returns:
+        number of rows aggregated
+    """
+    label = model._meta.label
+    dimension_name = dimension or ''
+    tz = get_interval_tz(pytz.utc)
+    upto = timezone.now() - datetime.timedelta(seconds=settle_seconds)
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+            model_label=label, field_name=field_name, dimension=dimension_name)
+        if watermark.watermark and watermark.watermark >= upto:
+            return 0
+        queryset = model._default_manager.filter(**{'{}__lte'.format(field_name): upto})
+        if watermark.watermark:
+            queryset = queryset.filter(**{'{}__gt'.format(field_name): watermark.watermark})
+        group_by = ['rollup_bucket'] + ([dimension] if dimension else [])
+        data = queryset.annotate(rollup_bucket=Trunc(field_name, ROLLUP_INTERVAL, tzinfo=tz)).values(*group_by) \
+            .annotate(count=Count('pk')).order_by()
+        increments = {}
+        for row in data:
+            key = (row['rollup_bucket'], get_dimension_value(row[dimension]) if dimension else '')
+            increments[key] = increments.get(key, 0) + row['count']
+
+        if increments:
+            existing = {(i.bucket, i.value): i for i in Rollup.objects.filter(
+                model_label=label, field_name=field_name, dimension=dimension_name,
+                bucket__in={i[0] for i in increments})}
+            to_update = []
+            to_create = []
+            for (bucket, value), count in increments.items():
+                rollup = existing.get((bucket, value))
+                if rollup:
+                    rollup.count += count
+                    to_update.append(rollup)
+                else:
+                    to_create.append(Rollup(model_label=label, field_name=field_name, dimension=dimension_name,
+                                            value=value, bucket=bucket, count=count))
+            Rollup.objects.bulk_update(to_update, ['count'], batch_size=500)
+            Rollup.objects.bulk_create(to_create, batch_size=500)
+
+        watermark.watermark = upto
+        watermark.save()
+    return sum(increments.values())
+
+
+def count_by_interval_rollup(model, field_name='created_at', interval='hour', periods=24, tz=None, dimension=None):
+    """
+    Description:
+        count a model's rows per interval over the last number of periods, reading from the rollups and merging in
+        the rows newer than the rollup watermark. Intervals without entries are returned as 0.
+
+    Args:
+        model: django model
+        field_name: datetime field the rollup was built on (string)
+        interval: one of 'hour', 'day', 'week', 'month', 'quarter', 'year' (string)
+        periods: number of intervals to return (int)
+        tz: timezone (tzinfo or name) used to define bucket boundaries; defaults to the current timezone
+        dimension: optional dimension the rollup was built on (string)
+
+    Returns:
+        list of counts per interval, starting with current interval, descending chronologically; if dimension is
+        provided, a dictionary of such lists keyed by dimension value
+    """
+    tz, buckets, start, end = get_interval_range(interval, periods, tz)
+    dimension_name = dimension or ''
+    watermark = RollupWatermark.objects.filter(model_label=model._meta.label, field_name=field_name,
+                                               dimension=dimension_name).values_list('watermark', flat=True).first()
+
+    counts = {}
+    if watermark:
+        rolled = Rollup.objects.filter(model_label=model._meta.label, field_name=field_name, dimension=dimension_name,
+                                       bucket__gte=start, bucket__lt=end) \
+            .annotate(interval_bucket=Trunc('bucket', interval, tzinfo=tz)).values('interval_bucket', 'value') \
+            .annotate(count=Sum('count')).order_by()
+        for row in rolled:
+            key = (row['value'], get_bucket_key(row['interval_bucket'], tz))
+            counts[key] = counts.get(key, 0) + row['count']
+
+    live = model._default_manager.filter(**{'{}__gte'.format(field_name): start, '{}__lt'.format(field_name): end})
+    if watermark:
+        live = live.filter(**{'{}__gt'.format(field_name): watermark})
+    group_by = ['interval_bucket'] + ([dimension] if dimension else [])
+    live = live.annotate(interval_bucket=Trunc(field_name, interval, tzinfo=tz)).values(*group_by) \
+        .annotate(count=Count('pk')).order_by()
+    for row in live:
+        key = (get_dimension_value(row[dimension]) if dimension else '', get_bucket_key(row['interval_bucket'], tz))
+        counts[key] = counts.get(key, 0) + row['count']
+
+    if not dimension:
+        return [counts.get(('', i), 0) for i in buckets]
+    return {value: [counts.get((value, i), 0) for i in buckets] for value in sorted({i[0] for i in counts})}
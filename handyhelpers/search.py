@@ -0,0 +1,226 @@
+"""
+Description:
+    Indexed full-text search of model fields. search() filters a queryset by free text through a SQLite FTS5 table or
+    a PostgreSQL GIN index on to_tsvector() of the declared fields, and falls back to icontains on other backends or
+    where an index has not been built.
+
+How to use:
+    Declare the searchable fields of your models in your settings and build the indexes with the
+    update_search_indexes management command:
+
+        SEARCH_DEFINITIONS = [{'model': 'myapp.Host', 'fields': ['hostname', 'description']}, ]
+
+    Views using the FilterByQueryParamsMixin then accept a q query parameter (ex. /hosts/?q=web prod); or call:
+
+        search(Host.objects.all(), 'web prod')
+
+    Every term must match (in any of the fields). SQLite indexes are kept current by triggers and match terms by
+    prefix; PostgreSQL indexes are maintained by the database and match terms by lexeme using the text search
+    configuration in SEARCH_CONFIG (settings; defaults to 'simple').
+"""
+
+# import system modules
+import re
+
+# import Django modules
+from django.conf import settings
+from django.db import connections
+from django.db.backends.utils import truncate_name
+from django.db.models import AutoField, IntegerField, Q
+
+# import handyhelpers modules
+from handyhelpers.querysets import RawSubquery
+
+# per-database and model record of the search indexes found; {(database alias, model): tuple of fields covered}
+SEARCH_INDEX_REGISTRY = {}
+
+
+class IContainsSearchBackend:
+    """ match every term of the query in any of the fields with icontains (no index) """
+    vendor = None
+
+    @staticmethod
+    def get_index_name(connection, model):
+        """ return the name of the search index (or table) of a model """
+        return truncate_name('{}_search'.format(model._meta.db_table), connection.ops.max_name_length())
+
+    def index_exists(self, connection, model, fields):
+        """ return True if a search index of the model exists in the database and was built for the fields """
+        return False
+
+    def build_index(self, connection, model, fields):
+        """ create (or recreate) the search index of a model for a list of fields """
+        raise ValueError('indexed search is not available for the {} database backend'.format(connection.vendor))
+
+    def drop_index(self, connection, model):
+        """ remove the search index of a model """
+
+    def filter(self, queryset, connection, fields, query):
+        """ return queryset filtered to rows matching the search query """
+        condition = Q()
+        for term in query.split():
+            term_condition = Q()
+            for field in fields:
+                term_condition |= Q(**{'{}__icontains'.format(field): term})
+            condition &= term_condition
+        return queryset.filter(condition)
+
+
+class SqliteSearchBackend(IContainsSearchBackend):
+    """ search an FTS5 virtual table using the model table as external content, kept current by triggers """
+    vendor = 'sqlite'
+
+    def index_exists(self, connection, model, fields):
+        index = self.get_index_name(connection, model)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [index])
+            if cursor.fetchone() is None:
+                return False
+            cursor.execute('PRAGMA table_info({})'.format(connection.ops.quote_name(index)))
+            columns = {row[1] for row in cursor.fetchall()}
+        return columns == {model._meta.get_field(i).column for i in fields}
+
+    def build_index(self, connection, model, fields):
+        if not isinstance(model._meta.pk, (AutoField, IntegerField)):
+            raise ValueError('FTS5 search indexes require an integer primary key')
+        qn = connection.ops.quote_name
+        index = self.get_index_name(connection, model)
+        table = model._meta.db_table
+        pk = model._meta.pk.column
+        columns = [model._meta.get_field(i).column for i in fields]
+        names = ', '.join(qn(i) for i in columns)
+        new = ', '.join('new.{}'.format(qn(i)) for i in columns)
+        old = ', '.join('old.{}'.format(qn(i)) for i in columns)
+        context = dict(index=qn(index), table=qn(table), pk=qn(pk), names=names, new=new, old=old,
+                       delete="INSERT INTO {0} ({0}, rowid, {1}) VALUES ('delete', old.{2}, {3});".format(
+                           qn(index), names, qn(pk), old))
+        self.drop_index(connection, model)
+        statements = [
+            "CREATE VIRTUAL TABLE {index} USING fts5({names}, content='{table_name}', content_rowid='{pk_name}')",
+            'CREATE TRIGGER {ai} AFTER INSERT ON {table} BEGIN '
+            'INSERT INTO {index} (rowid, {names}) VALUES (new.{pk}, {new}); END',
+            'CREATE TRIGGER {ad} AFTER DELETE ON {table} BEGIN {delete} END',
+            'CREATE TRIGGER {au} AFTER UPDATE ON {table} BEGIN {delete} '
+            'INSERT INTO {index} (rowid, {names}) VALUES (new.{pk}, {new}); END',
+            "INSERT INTO {index} ({index}) VALUES ('rebuild')",
+        ]
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement.format(table_name=table, pk_name=pk, ai=qn(index + '_ai'),
+                                                ad=qn(index + '_ad'), au=qn(index + '_au'), **context))
+
+    def drop_index(self, connection, model):
+        qn = connection.ops.quote_name
+        index = self.get_index_name(connection, model)
+        with connection.cursor() as cursor:
+            for suffix in ('_ai', '_ad', '_au'):
+                cursor.execute('DROP TRIGGER IF EXISTS {}'.format(qn(index + suffix)))
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(qn(index)))
+
+    def filter(self, queryset, connection, fields, query):
+        index = connection.ops.quote_name(self.get_index_name(connection, queryset.model))
+        terms = ' '.join('"{}"*'.format(i.replace('"', '""')) for i in query.split())
+        return queryset.filter(pk__in=RawSubquery('SELECT rowid FROM {0} WHERE {0} MATCH %s'.format(index), [terms]))
+
+
+class PostgresSearchBackend(IContainsSearchBackend):
+    """ search a GIN expression index on to_tsvector() of the fields """
+    vendor = 'postgresql'
+
+    @staticmethod
+    def get_config():
+        """ return the text search configuration used by the index and queries """
+        config = getattr(settings, 'SEARCH_CONFIG', 'simple')
+        if not re.match(r'^\w+$', config):
+            raise ValueError('invalid SEARCH_CONFIG: {}'.format(config))
+        return config
+
+    def get_document(self, connection, model, fields):
+        """ return the to_tsvector() expression of the fields; queries must repeat it exactly to use the index """
+        qn = connection.ops.quote_name
+        columns = " || ' ' || ".join("coalesce({}::text, '')".format(qn(model._meta.get_field(i).column))
+                                     for i in fields)
+        return "to_tsvector('{}', {})".format(self.get_config(), columns)
+
+    def index_exists(self, connection, model, fields):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname = %s',
+                           [model._meta.db_table, self.get_index_name(connection, model)])
+            row = cursor.fetchone()
+        if row is None or "to_tsvector('{}'::regconfig".format(self.get_config()) not in row[0]:
+            return False
+        # the index definition is normalized by PostgreSQL; check that it reads the column of every field
+        return all(re.search(r'(?<!\w)"?{}"?(?!\w)'.format(re.escape(model._meta.get_field(i).column)), row[0])
+                   for i in fields)
+
+    def build_index(self, connection, model, fields):
+        qn = connection.ops.quote_name
+        self.drop_index(connection, model)
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE INDEX {} ON {} USING GIN ({})'.format(
+                qn(self.get_index_name(connection, model)), qn(model._meta.db_table),
+                self.get_document(connection, model, fields)))
+
+    def drop_index(self, connection, model):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX IF EXISTS {}'.format(
+                connection.ops.quote_name(self.get_index_name(connection, model))))
+
+    def filter(self, queryset, connection, fields, query):
+        model = queryset.model
+        sql = "SELECT {} FROM {} WHERE {} @@ plainto_tsquery('{}', %s)".format(
+            connection.ops.quote_name(model._meta.pk.column), connection.ops.quote_name(model._meta.db_table),
+            self.get_document(connection, model, fields), self.get_config())
+        return queryset.filter(pk__in=RawSubquery(sql, [query]))
+
+
+SEARCH_BACKENDS = {i.vendor: i() for i in (SqliteSearchBackend, PostgresSearchBackend)}
+
+
+def get_search_backend(connection):
+    """ return the search backend of a database connection """
+    return SEARCH_BACKENDS.get(connection.vendor, IContainsSearchBackend())
+
+
+def get_search_fields(model):
+    """ return the list of fields declared for a model in SEARCH_DEFINITIONS; an empty list if not declared """
+    for definition in getattr(settings, 'SEARCH_DEFINITIONS', []):
+        if definition['model'].lower() == model._meta.label_lower:
+            return list(definition['fields'])
+    return []
+
+
+def has_search_index(connection, model, fields):
+    """ return True if the search index of a model exists and was built for the fields; indexes found are cached
+    per database and model, missing ones are looked up again on the next call """
+    key = (connection.alias, model)
+    if SEARCH_INDEX_REGISTRY.get(key) == tuple(fields):
+        return True
+    if not get_search_backend(connection).index_exists(connection, model, fields):
+        return False
+    SEARCH_INDEX_REGISTRY[key] = tuple(fields)
+    return True
+
+
+def search(queryset, query, fields=None):
+    """
+    Description:
+        filter a queryset to the rows matching every term of a free-text query in any of the fields. The search index
+        is used if it was built for the same fields (see update_search_indexes); otherwise icontains is used.
+
+    Args:
+        queryset: django queryset
+        query: free-text search query (string)
+        fields: list of field names to search; defaults to the fields declared in SEARCH_DEFINITIONS
+
+    Returns:
+        filtered queryset; the queryset unchanged if the query is empty or no fields are available
+    """
+    declared = get_search_fields(queryset.model)
+    fields = list(fields or declared)
+    if not query or not query.split() or not fields:
+        return queryset
+    connection = connections[queryset.db]
+    if set(fields) == set(declared) and has_search_index(connection, queryset.model, declared):
+        return get_search_backend(connection).filter(queryset, connection, declared, query)
+    return IContainsSearchBackend().filter(queryset, connection, fields, query)
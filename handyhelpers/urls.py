@@ -1,5 +1,5 @@
 from django.urls import path
-from handyhelpers.views import action
+from handyhelpers.views import action, audit
 
 app_name = 'handyhelpers'
 
@@ -7,4 +7,8 @@ urlpatterns = [
     # action views
     path('filter_list_view', action.FilterListView.as_view(), name='filter_list_view'),
     path('show_all_list_view', action.ShowAllListView.as_view(), name='show_all_list_view'),
+
+    # audit log views
+    path('show_audit_log', audit.ShowAuditLogView.as_view(), name='show_audit_log'),
+    path('show_audit_log_changes', audit.ShowAuditLogChangesView.as_view(), name='show_audit_log_changes'),
 ]
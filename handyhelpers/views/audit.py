@@ -0,0 +1,170 @@
+"""
+This file contains views used to browse an audit log (django-auditlog's LogEntry by default) page by page. Entries are
+paged with keyset cursors on the primary key and listed without their change details, which are loaded for a single
+entry when it is expanded. Both views return json ({'server_response': html}) for use with the handyhelpers modals.
+"""
+
+import datetime
+
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.generic import View
+
+try:
+    from auditlog.models import LogEntry
+except ImportError:
+    LogEntry = None
+
+
+class AuditLogMixin(PermissionRequiredMixin):
+    """
+    Mixin used to access an audit log model.
+
+    class parameters:
+        model               - audit log model; defaults to auditlog.models.LogEntry
+        permission_required - permission required to view the audit log; defaults to auditlog.view_logentry
+    """
+    model = LogEntry
+    permission_required = 'auditlog.view_logentry'
+    raise_exception = True
+
+    def get_model(self):
+        """ return the audit log model """
+        if self.model is None:
+            raise ImproperlyConfigured('django-auditlog is not installed; set model on {}'.format(
+                self.__class__.__name__))
+        return self.model
+
+
+class ShowAuditLogView(AuditLogMixin, View):
+    """
+    Render a page of audit log entries, newest first. Entries can be filtered with the query parameters content_type
+    (id or app_label.model), object_id, actor (id), start and end (ISO date or datetime); invalid parameters are
+    ignored. The next page is requested with the cursor query parameter, which returns only the table rows. The
+    change details of an entry are loaded from the view named in changes_url_name when the entry is expanded.
+
+    class parameters:
+        template_name      - template used to render the first page
+        rows_template_name - template used to render the table rows of subsequent pages
+        changes_url_name   - url name of the view rendering the change details of an entry
+        page_size          - number of entries per page; can be set with the page_size query parameter
+        max_page_size      - maximum number of entries per page
+        related_fields     - relations joined when listing entries; relations the model does not have are skipped
+        deferred_fields    - fields not loaded when listing entries; fields the model does not have are skipped
+    """
+    template_name = 'handyhelpers/ajax/show_audit_log.htm'
+    rows_template_name = 'handyhelpers/ajax/audit_log_rows.htm'
+    changes_url_name = 'handyhelpers:show_audit_log_changes'
+    page_size = 25
+    max_page_size = 200
+    related_fields = ('content_type', 'actor')
+    deferred_fields = ('changes', 'additional_data')
+
+    @staticmethod
+    def get_datetime(value):
+        """ return an aware datetime for an ISO date or datetime string; None if invalid """
+        try:
+            parsed = parse_datetime(value) or parse_date(value)
+        except ValueError:
+            return None
+        if parsed is None:
+            return None
+        if not hasattr(parsed, 'hour'):
+            parsed = datetime.datetime.combine(parsed, datetime.time.min)
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    def get_audit_queryset(self):
+        """ return the audit log entries matching the query parameters, newest first """
+        model = self.get_model()
+        params = self.request.GET
+        queryset = model.objects.all()
+        content_type = params.get('content_type')
+        if content_type:
+            if content_type.isdigit():
+                queryset = queryset.filter(content_type_id=content_type)
+            elif '.' in content_type:
+                try:
+                    content_type = ContentType.objects.get_by_natural_key(*content_type.lower().split('.', 1))
+                    queryset = queryset.filter(content_type=content_type)
+                except ContentType.DoesNotExist:
+                    return queryset.none()
+        if params.get('object_id'):
+            queryset = queryset.filter(object_pk=params['object_id'])
+        if params.get('actor', '').isdigit():
+            queryset = queryset.filter(actor_id=params['actor'])
+        for name, lookup in (('start', 'timestamp__gte'), ('end', 'timestamp__lt')):
+            value = self.get_datetime(params.get(name, ''))
+            if value:
+                queryset = queryset.filter(**{lookup: value})
+        return queryset.order_by('-pk')
+
+    def get_model_fields(self, names, relations=False):
+        """ return the names in a list of field names that are fields (or, if relations is True, forward relations)
+        of the audit log model """
+        model = self.get_model()
+        fields = []
+        for name in names:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not relations or field.many_to_one or field.one_to_one:
+                fields.append(name)
+        return fields
+
+    def get_page_size(self):
+        """ return the number of entries per page """
+        try:
+            return max(1, min(int(self.request.GET.get('page_size', self.page_size)), self.max_page_size))
+        except ValueError:
+            return self.page_size
+
+    def get_page(self):
+        """ return a tuple of (list of entries on the page, cursor of the next page or None) """
+        queryset = self.get_audit_queryset()
+        cursor = self.request.GET.get('cursor', '')
+        if cursor.isdigit():
+            queryset = queryset.filter(pk__lt=cursor)
+        related_fields = self.get_model_fields(self.related_fields, relations=True)
+        if related_fields:
+            queryset = queryset.select_related(*related_fields)
+        page_size = self.get_page_size()
+        rows = list(queryset.defer(*self.get_model_fields(self.deferred_fields))[:page_size + 1])
+        if len(rows) > page_size:
+            return rows[:page_size], rows[page_size - 1].pk
+        return rows, None
+
+    def get(self, request, *args, **kwargs):
+        rows, cursor = self.get_page()
+        next_url = None
+        if cursor is not None:
+            params = request.GET.copy()
+            params['cursor'] = cursor
+            next_url = '{}?{}'.format(request.path, params.urlencode())
+        context = dict(queryset=rows, next_url=next_url, changes_url=reverse(self.changes_url_name))
+        template_name = self.rows_template_name if 'cursor' in request.GET else self.template_name
+        return JsonResponse({'server_response': render_to_string(template_name, context, request=request),
+                             'next_url': next_url})
+
+
+class ShowAuditLogChangesView(AuditLogMixin, View):
+    """
+    Render the change details of the audit log entry identified by the id (or client_response) query parameter.
+
+    class parameters:
+        template_name - template used to render the change details
+    """
+    template_name = 'handyhelpers/ajax/show_audit_log_changes.htm'
+
+    def get(self, request, *args, **kwargs):
+        pk = request.GET.get('id', request.GET.get('client_response', ''))
+        row = get_object_or_404(self.get_model(), pk=pk if pk.isdigit() else None)
+        return JsonResponse({'server_response': render_to_string(self.template_name, dict(row=row),
+                                                                 request=request)})
@@ -4,6 +4,20 @@ import xlwt
 from django.http import HttpResponse
 from django.views.generic import View
 from handyhelpers.mixins.view_mixins import FilterByQueryParamsMixin
+from handyhelpers.querysets import get_ordering, iterate_in_chunks
+
+
+def iterate_export_rows(queryset, values=None, chunk_size=1000):
+    """ iterate over the rows of an export in the ordering of the queryset; querysets ordered by primary key (or not
+    ordered) are paged by primary key, others are read with a chunked iterator """
+    ordering = get_ordering(queryset)
+    pk_names = ('pk', queryset.model._meta.pk.name)
+    if not ordering or (len(ordering) == 1 and isinstance(ordering[0], str) and ordering[0].lstrip('-') in pk_names):
+        order = '-pk' if ordering and ordering[0].startswith('-') else 'pk'
+        return iterate_in_chunks(queryset, chunk_size=chunk_size, order=order, values=values)
+    if values is not None:
+        queryset = queryset.values_list(*values)
+    return queryset.iterator(chunk_size=chunk_size)
 
 
 class CsvExportView(FilterByQueryParamsMixin, View):
@@ -30,7 +44,7 @@ class CsvExportView(FilterByQueryParamsMixin, View):
             writer.writeheader()
 
             queryset = self.filter_by_query_params()
-            for row in queryset:
+            for row in iterate_export_rows(queryset):
                 writer.writerow({column: str(getattr(row, column)) for column in headers})
             return response
         except AttributeError:
@@ -74,7 +88,7 @@ class ExcelExportView(FilterByQueryParamsMixin, View):
             font_style = xlwt.XFStyle()
 
             queryset = self.filter_by_query_params()
-            for row in queryset.values_list():
+            for row in iterate_export_rows(queryset, values=[field.attname for field in model._meta.concrete_fields]):
                 row_num += 1
                 for col_num in range(len(row)):
                     if type(row[col_num]) == datetime.datetime:
@@ -3,6 +3,7 @@ from django.shortcuts import render
 from django.views.generic import ListView, View
 
 from handyhelpers.mixins.view_mixins import FilterByQueryParamsMixin
+from handyhelpers.models import SingletonModel
 
 
 class HandyHelperGenericBaseView(View):
@@ -151,13 +152,17 @@ class HandyHelperSingletonView(HandyHelperGenericBaseView):
         args          - additional args to pass into the template
         kwargs        - additional kwargs to pass into the template
         template_name - template used when rendering page
-        model         - singleton model
+        model         - singleton model; the row of a handyhelpers.models.SingletonModel subclass is read with load()
     """
     template_name = None
     model = None
 
     def get(self, request):
-        context = dict(object=self.model.objects.get(), args=self.args, kwargs=self.kwargs)
+        if issubclass(self.model, SingletonModel):
+            obj = self.model.load()
+        else:
+            obj = self.model.objects.get()
+        context = dict(object=obj, args=self.args, kwargs=self.kwargs)
         return render(request, self.template_name, context)
 
 
@@ -0,0 +1,28 @@
+"""
+URLs used by the loadtest_drf command; this module imports the files created by generate_drf and is only importable
+after the command has generated them.
+"""
+from django.urls import path
+from django.conf.urls import include
+from rest_framework import routers
+
+from loadtest import apis, serializers, urls
+
+
+class ItemExpandedSerializer(serializers.ItemSerializer):
+    class Meta(serializers.ItemSerializer.Meta):
+        depth = 1
+
+
+class ItemExpandedViewSet(apis.ItemViewSet):
+    """ generated Item viewset rendering related objects nested (depth=1) """
+    queryset = apis.Item.objects.select_related('owner', 'category')
+    serializer_class = ItemExpandedSerializer
+
+
+router = routers.DefaultRouter()
+router.register(r'item_expanded', ItemExpandedViewSet, 'item_expanded')
+
+urlpatterns = urls.urlpatterns + [
+    path('api/', include(router.urls)),
+]
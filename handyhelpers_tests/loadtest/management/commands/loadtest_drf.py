@@ -0,0 +1,129 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+import importlib
+import io
+import os
+import random
+import threading
+import time
+
+from handyhelpers.profiler import percentile
+
+__version__ = "0.0.1"
+
+
+class Command(BaseCommand):
+    help = 'Generate DRF files for the loadtest app, seed a test database and report throughput and latency ' \
+           'percentiles of the generated APIs'
+
+    scenarios = ('list', 'detail', 'filtered', 'expanded')
+
+    def __init__(self, *args, **kwargs):
+        self.opts = None
+        self.item_ids = None
+        self.owner_ids = None
+        super(Command, self).__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        """ define command arguments """
+        parser.add_argument('--records', type=int, default=1000, help='number of Item rows to seed')
+        parser.add_argument('--requests', type=int, default=200, help='number of requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=4, help='number of concurrent client threads')
+        parser.add_argument('--scenario', type=str, action='append', choices=self.scenarios,
+                            help='scenario to run (may be repeated); all scenarios are run by default')
+        parser.add_argument('--seed', type=int, default=0, help='random seed used for data and request selection')
+
+    def handle(self, *args, **options):
+        """ command entry point """
+        self.opts = options
+        random.seed(options['seed'])
+        self.generate_drf()
+
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed_data()
+            with override_settings(ROOT_URLCONF='loadtest.loadtest_urls'):
+                self.stdout.write('{:<10} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+                    'scenario', 'requests', 'errors', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'))
+                for scenario in options['scenario'] or self.scenarios:
+                    self.report(scenario, *self.run_scenario(scenario))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    @staticmethod
+    def generate_drf():
+        """ create serializers.py, apis.py and urls.py in the loadtest app using generate_drf """
+        output_path = os.path.dirname(importlib.import_module('loadtest').__file__)
+        call_command('generate_drf', 'loadtest', '--serializer', '--api', '--url', '--output_path', output_path,
+                     stdout=io.StringIO())
+        importlib.invalidate_caches()
+
+    def seed_data(self):
+        """ populate the test database with synthetic rows """
+        from loadtest.models import Owner, Category, Item
+        records = self.opts['records']
+        Owner.objects.bulk_create([Owner(name='owner_{}'.format(i), email='owner_{}@example.com'.format(i))
+                                   for i in range(max(records // 50, 1))])
+        Category.objects.bulk_create([Category(name='category_{}'.format(i)) for i in range(10)])
+        self.owner_ids = list(Owner.objects.values_list('id', flat=True))
+        category_ids = list(Category.objects.values_list('id', flat=True))
+        statuses = [i[0] for i in Item.STATUS_CHOICES]
+        Item.objects.bulk_create([Item(name='item_{}'.format(i), status=random.choice(statuses),
+                                       quantity=random.randint(0, 1000), owner_id=random.choice(self.owner_ids),
+                                       category_id=random.choice(category_ids)) for i in range(records)],
+                                 batch_size=500)
+        self.item_ids = list(Item.objects.values_list('id', flat=True))
+
+    def get_url(self, scenario):
+        """ return a url to request for a given scenario """
+        if scenario == 'list':
+            return '/api/item/'
+        if scenario == 'detail':
+            return '/api/item/{}/'.format(random.choice(self.item_ids))
+        if scenario == 'filtered':
+            return '/api/item/?status=open&owner={}'.format(random.choice(self.owner_ids))
+        return '/api/item_expanded/?owner={}'.format(random.choice(self.owner_ids))
+
+    def run_scenario(self, scenario):
+        """ issue requests for a scenario from concurrent threads; return (latencies, errors, elapsed seconds) """
+        urls = [self.get_url(scenario) for _ in range(self.opts['requests'])]
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(url_list):
+            client = Client()
+            local_latencies = []
+            local_errors = 0
+            for url in url_list:
+                start = time.perf_counter()
+                response = client.get(url)
+                local_latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    local_errors += 1
+            connections.close_all()
+            with lock:
+                latencies.extend(local_latencies)
+                errors.append(local_errors)
+
+        concurrency = max(self.opts['concurrency'], 1)
+        threads = [threading.Thread(target=worker, args=(urls[i::concurrency],)) for i in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, sum(errors), time.perf_counter() - start
+
+    def report(self, scenario, latencies, errors, elapsed):
+        """ write the results of a scenario """
+        values = sorted(latencies)
+        self.stdout.write('{:<10} {:>8} {:>7} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+            scenario, len(values), errors, len(values) / elapsed if elapsed else 0,
+            percentile(values, 50) * 1000, percentile(values, 90) * 1000,
+            percentile(values, 99) * 1000, values[-1] * 1000 if values else 0))
@@ -0,0 +1,39 @@
+"""
+Description:
+    synthetic models used by the loadtest_drf command to exercise the code produced by generate_drf
+"""
+
+# django modules
+from django.db import models
+
+# handyhelpers modules
+from handyhelpers.models import HandyHelperBaseModel
+
+
+class Owner(HandyHelperBaseModel):
+    name = models.CharField(max_length=64, unique=True)
+    email = models.EmailField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Category(HandyHelperBaseModel):
+    name = models.CharField(max_length=64, unique=True)
+    description = models.CharField(max_length=255, blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Item(HandyHelperBaseModel):
+    STATUS_CHOICES = (('open', 'open'), ('closed', 'closed'), ('pending', 'pending'))
+
+    name = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='open')
+    quantity = models.IntegerField(default=0)
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+
+    def __str__(self):
+        return self.name
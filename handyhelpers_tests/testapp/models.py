@@ -0,0 +1,92 @@
+"""
+Description:
+    models used by the handyhelpers unit tests
+"""
+
+# system modules
+import uuid
+
+# django modules
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+
+# handyhelpers modules
+from handyhelpers.managers import HandyHelperModelManager, ParentModelMixin
+from handyhelpers.models import HandyHelperBaseModel, SingletonModel
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=32)
+
+    def __str__(self):
+        return self.name
+
+
+class Record(HandyHelperBaseModel):
+    name = models.CharField(max_length=32, blank=True, null=True)
+    status = models.CharField(max_length=16, default='open')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tag = models.ForeignKey(Tag, blank=True, null=True, on_delete=models.SET_NULL)
+
+    def __str__(self):
+        return self.name or ''
+
+
+class Preferences(SingletonModel):
+    title = models.CharField(max_length=32, default='handyhelpers')
+    tag = models.ForeignKey(Tag, blank=True, null=True, on_delete=models.SET_NULL)
+
+
+class Team(models.Model):
+    name = models.CharField(max_length=32)
+    groups = models.ManyToManyField(Group, blank=True)
+
+
+class Project(models.Model):
+    name = models.CharField(max_length=32)
+    team = models.ForeignKey(Team, blank=True, null=True, on_delete=models.SET_NULL)
+    group = models.ForeignKey(Group, blank=True, null=True, on_delete=models.SET_NULL)
+
+
+class Token(models.Model):
+    objects = HandyHelperModelManager()
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    name = models.CharField(max_length=32)
+
+
+class Animal(ParentModelMixin, HandyHelperBaseModel):
+    name = models.CharField(max_length=32)
+    child_type = models.CharField(max_length=100, blank=True, editable=False)
+    child_type_field = 'child_type'
+
+
+class Dog(Animal):
+    breed = models.CharField(max_length=32, blank=True)
+
+
+class Puppy(Dog):
+    age_weeks = models.IntegerField(default=8)
+
+
+class Cat(Animal):
+    indoor = models.BooleanField(default=True)
+
+
+class Host(HandyHelperBaseModel):
+    hostname = models.CharField(max_length=64, unique=True)
+    ip = models.CharField(max_length=15, blank=True)
+    status = models.CharField(max_length=16, default='up')
+
+
+class AuditEntry(models.Model):
+    """ audit log model with the fields of auditlog.models.LogEntry used by the audit log views (no additional_data) """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_pk = models.CharField(max_length=255)
+    object_repr = models.TextField()
+    action = models.PositiveSmallIntegerField(default=1)
+    changes = models.TextField(blank=True)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.SET_NULL)
+    timestamp = models.DateTimeField(default=timezone.now)
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.migrations.writer import MigrationWriter
+from django.test import TestCase
+
+from handyhelpers.management.commands.advise_indexes import Command
+from testapp.models import Record
+
+
+class AdviseIndexesTests(TestCase):
+    def setUp(self):
+        Record.objects.bulk_create([Record(name='record_{}'.format(i), status=('open', 'closed')[i % 2])
+                                    for i in range(100)])
+        User.objects.bulk_create([User(username='user_{}'.format(i), first_name='first_{}'.format(i))
+                                  for i in range(100)])
+        handle, self.query_log = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(handle, 'w') as f:
+            f.write('SELECT * FROM "testapp_record" WHERE "testapp_record"."status" = \'open\'\n')
+            f.write('SELECT * FROM "testapp_record" WHERE "testapp_record"."name" = \'record_1\'\n')
+            f.write('SELECT * FROM "auth_user" WHERE "auth_user"."first_name" = \'first_1\'\n')
+
+    def tearDown(self):
+        os.remove(self.query_log)
+
+    def advise(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('advise_indexes', *args, query_log=self.query_log, min_rows=10, fraction=1, stdout=stdout,
+                     stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_low_cardinality_column_skipped(self):
+        stdout = self.advise('testapp')[0]
+        self.assertIn("models.Index(fields=['name']", stdout)
+        self.assertNotIn("models.Index(fields=['status']", stdout)
+
+    def test_max_selectivity(self):
+        stdout = self.advise('testapp', '--max_selectivity', '0.5')[0]
+        self.assertIn("models.Index(fields=['status']", stdout)
+
+    def test_migration_limited_to_project_apps(self):
+        path = os.path.join(tempfile.mkdtemp(), 'migration.py')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with mock.patch.object(MigrationWriter, 'path', new_callable=mock.PropertyMock, return_value=path):
+            stdout, stderr = self.advise('--migration')
+        self.assertFalse(os.path.exists(path))
+        self.assertIn("models.Index(fields=['first_name']", stdout)
+        self.assertIn('auth: app is not part of the project', stderr)
+        self.assertIn('testapp: app has no migrations', stderr)
+
+    def test_writable_apps(self):
+        command = Command()
+        command.opts = {'app': []}
+        self.assertTrue(command.is_writable(apps.get_app_config('testapp')))
+        self.assertFalse(command.is_writable(apps.get_app_config('auth')))
+        self.assertFalse(command.is_writable(apps.get_app_config('rest_framework')))
+        command.opts = {'app': ['auth']}
+        self.assertTrue(command.is_writable(apps.get_app_config('auth')))
+        self.assertFalse(command.is_writable(apps.get_app_config('testapp')))
@@ -0,0 +1,71 @@
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from handyhelpers.views.audit import ShowAuditLogView
+from testapp.models import AuditEntry, Tag
+
+
+class AuditEntryLogView(ShowAuditLogView):
+    model = AuditEntry
+    permission_required = 'testapp.view_auditentry'
+    changes_url_name = 'admin:index'
+
+
+class ShowAuditLogViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='admin', is_superuser=True)
+        tag_type = ContentType.objects.get_for_model(Tag)
+        now = timezone.now()
+        AuditEntry.objects.bulk_create([
+            AuditEntry(content_type=tag_type, object_pk=str(i), object_repr='tag_{}'.format(i), changes='{"name": []}',
+                       actor=self.user, timestamp=now - datetime.timedelta(minutes=i)) for i in range(7)])
+        self.pks = list(AuditEntry.objects.order_by('-pk').values_list('pk', flat=True))
+
+    def get_page(self, **params):
+        request = RequestFactory().get('/audit', params)
+        request.user = self.user
+        view = AuditEntryLogView()
+        view.setup(request)
+        with CaptureQueriesContext(connection) as queries:
+            rows, cursor = view.get_page()
+        self.statements = [i['sql'] for i in queries.captured_queries]
+        return [i.pk for i in rows], cursor
+
+    def test_keyset_pages(self):
+        pks, cursor = self.get_page(page_size=3)
+        self.assertEqual(pks, self.pks[:3])
+        pks, cursor = self.get_page(page_size=3, cursor=cursor)
+        self.assertEqual(pks, self.pks[3:6])
+        self.assertIn('"id" < ', self.statements[0])
+        self.assertNotIn('OFFSET', self.statements[0])
+        pks, cursor = self.get_page(page_size=3, cursor=cursor)
+        self.assertEqual((pks, cursor), (self.pks[6:], None))
+
+    def test_list_query(self):
+        self.get_page(page_size=3)
+        self.assertEqual(len(self.statements), 1)
+        self.assertIn('"django_content_type"', self.statements[0])
+        self.assertIn('"auth_user"', self.statements[0])
+        self.assertNotIn('"changes"', self.statements[0])
+
+    def test_filters(self):
+        self.assertEqual(self.get_page(object_id='2')[0], [self.pks[-3]])
+        self.assertEqual(self.get_page(content_type='testapp.tag', page_size=2)[0], self.pks[:2])
+        self.assertEqual(self.get_page(content_type='testapp.missing')[0], [])
+
+    def test_response(self):
+        request = RequestFactory().get('/audit', {'page_size': 3})
+        request.user = self.user
+        response = AuditEntryLogView.as_view()(request)
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('tag_6', data['server_response'])
+        self.assertNotIn('tag_3', data['server_response'])
+        self.assertEqual(data['next_url'], '/audit?page_size=3&cursor={}'.format(self.pks[2]))
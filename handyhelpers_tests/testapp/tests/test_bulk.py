@@ -0,0 +1,85 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers, viewsets
+from rest_framework.test import APIRequestFactory
+
+from handyhelpers.mixins.viewset_mixins import BulkViewSetMixin
+from testapp.models import Record, Tag
+
+
+class RecordSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Record
+        fields = ['id', 'name', 'status', 'tag']
+
+
+class RecordViewSet(BulkViewSetMixin, viewsets.ModelViewSet):
+    queryset = Record.objects.all()
+    serializer_class = RecordSerializer
+    authentication_classes = []
+    permission_classes = []
+    bulk_batch_size = 3
+
+
+class BulkViewSetTests(TestCase):
+    def setUp(self):
+        self.tags = [Tag.objects.create(name='tag_{}'.format(i)) for i in range(2)]
+        self.view = RecordViewSet.as_view({'post': 'bulk', 'put': 'bulk', 'patch': 'bulk', 'delete': 'bulk'})
+
+    def request(self, method, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(getattr(APIRequestFactory(), method)('/records/bulk/', data, format='json'))
+        statements = [i['sql'] for i in queries.captured_queries if 'SAVEPOINT' not in i['sql']]
+        return response, statements
+
+    def test_create(self):
+        items = [{'name': 'record_{}'.format(i), 'tag': self.tags[i % 2].pk} for i in range(7)]
+        response, statements = self.request('post', items)
+        self.assertEqual((response.status_code, response.data), (201, {'created': 7}))
+        # per batch of 3: one tag lookup and one insert
+        self.assertEqual(len(statements), 6)
+        self.assertEqual(Record.objects.filter(tag=self.tags[1]).count(), 3)
+
+    def test_create_errors(self):
+        response, statements = self.request('post', [{'name': 'valid'}, {'name': 'x' * 40}, {'tag': 999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([i['index'] for i in response.data['errors']], [1, 2])
+        self.assertFalse(Record.objects.exists())
+
+    def test_update(self):
+        records = [Record.objects.create(name='record_{}'.format(i)) for i in range(5)]
+        items = [{'id': str(i.pk), 'status': 'closed', 'tag': self.tags[0].pk} for i in records]
+        response, statements = self.request('patch', items)
+        self.assertEqual((response.status_code, response.data), (200, {'updated': 5}))
+        # per batch of 3: the rows and the tags; then one update per bulk_update batch
+        self.assertEqual(len(statements), 6)
+        self.assertEqual(Record.objects.filter(status='closed', tag=self.tags[0]).count(), 5)
+        self.assertEqual(Record.objects.get(pk=records[0].pk).name, 'record_0')
+
+    def test_update_errors(self):
+        record = Record.objects.create(name='record')
+        response, statements = self.request('put', [{'id': record.pk, 'name': 'x' * 40}, {'id': 999}, {'id': 'abc'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([i['index'] for i in response.data['errors']], [0, 1, 2])
+        self.assertEqual(Record.objects.get().name, 'record')
+
+    def test_delete(self):
+        records = [Record.objects.create(name='record_{}'.format(i)) for i in range(5)]
+        response, statements = self.request('delete', [records[0].pk, {'id': records[1].pk}] +
+                                            [str(i.pk) for i in records[2:4]])
+        self.assertEqual((response.status_code, response.data), (200, {'deleted': 4}))
+        # per batch of 3: the existing primary keys, and the delete
+        self.assertEqual(len(statements), 4)
+        self.assertEqual(list(Record.objects.values_list('name', flat=True)), ['record_4'])
+
+    def test_delete_errors(self):
+        record = Record.objects.create(name='record')
+        response, statements = self.request('delete', [record.pk, 'abc', 999, {'name': 'no pk'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [
+            {'index': 1, 'errors': {'detail': 'invalid primary key'}},
+            {'index': 2, 'errors': {'detail': 'not found'}},
+            {'index': 3, 'errors': {'detail': 'invalid primary key'}},
+        ])
+        self.assertTrue(Record.objects.filter(pk=record.pk).exists())
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.views.generic import View
+from rest_framework import serializers, viewsets
+from rest_framework.test import APIRequestFactory
+
+from handyhelpers.mixins.view_mixins import ConditionalListMixin, FilterByQueryParamsMixin
+from handyhelpers.mixins.viewset_mixins import ConditionalListViewSetMixin
+from testapp.models import Record
+
+
+class RecordListBaseView(FilterByQueryParamsMixin, View):
+    queryset = Record.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(','.join(i.name for i in self.filter_by_query_params()))
+
+
+class RecordListView(ConditionalListMixin, RecordListBaseView):
+    pass
+
+
+class RecordSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Record
+        fields = ['id', 'name']
+
+
+class RecordViewSet(ConditionalListViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Record.objects.all()
+    serializer_class = RecordSerializer
+    authentication_classes = []
+    permission_classes = []
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        self.records = [Record.objects.create(name='record_{}'.format(i)) for i in range(3)]
+
+    def get_view(self, **headers):
+        request = RequestFactory().get('/records/', **headers)
+        request.user = AnonymousUser()
+        return RecordListView.as_view()(request)
+
+    def get_viewset(self, **headers):
+        return RecordViewSet.as_view({'get': 'list'})(APIRequestFactory().get('/records/', **headers))
+
+    def test_view_etag_not_modified(self):
+        response = self.get_view()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_view(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_view_delete_then_if_modified_since(self):
+        last_modified = self.get_view()['Last-Modified']
+        self.records[0].delete()
+        response = self.get_view(HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'record_0', response.content)
+
+    def test_viewset_delete_then_if_modified_since(self):
+        first = self.get_viewset()
+        self.assertEqual(self.get_viewset(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.records[0].delete()
+        response = self.get_viewset(HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(self.get_viewset(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
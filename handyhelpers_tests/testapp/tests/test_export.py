@@ -0,0 +1,29 @@
+import csv
+import io
+
+from django.test import RequestFactory, TestCase
+
+from handyhelpers.views.export import CsvExportView, iterate_export_rows
+from testapp.models import Record
+
+
+class ExportOrderingTests(TestCase):
+    def setUp(self):
+        Record.objects.bulk_create([Record(name=name) for name in ('bravo', 'delta', 'alpha', 'charlie')])
+
+    def export_names(self, queryset):
+        response = CsvExportView.as_view(queryset=queryset)(RequestFactory().get('/'))
+        return [row['name'] for row in csv.DictReader(io.StringIO(response.content.decode()))]
+
+    def test_field_ordering_is_kept(self):
+        self.assertEqual(self.export_names(Record.objects.order_by('name')), ['alpha', 'bravo', 'charlie', 'delta'])
+
+    def test_descending_pk_ordering(self):
+        self.assertEqual(self.export_names(Record.objects.order_by('-pk')), ['charlie', 'alpha', 'delta', 'bravo'])
+
+    def test_unordered_queryset_is_paged_by_pk(self):
+        self.assertEqual(self.export_names(Record.objects.all()), ['bravo', 'delta', 'alpha', 'charlie'])
+
+    def test_values_in_queryset_ordering(self):
+        rows = iterate_export_rows(Record.objects.order_by('-name'), values=['name'], chunk_size=2)
+        self.assertEqual(list(rows), [('delta', ), ('charlie', ), ('bravo', ), ('alpha', )])
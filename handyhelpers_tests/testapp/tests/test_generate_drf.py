@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import serializers
+
+from handyhelpers.management.commands.generate_drf import Command
+from testapp.models import Project, Team
+
+
+class GenerateDrfTests(TestCase):
+    def setUp(self):
+        self.output_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_path)
+
+    def generate(self, *args):
+        call_command('generate_drf', 'testapp', '--serializer', '--api', *args, output_path=self.output_path,
+                     stdout=StringIO())
+        with open(os.path.join(self.output_path, 'serializers.py')) as f:
+            serializers_text = f.read()
+        with open(os.path.join(self.output_path, 'apis.py')) as f:
+            return serializers_text, f.read()
+
+    def test_default(self):
+        serializers_text, apis_text = self.generate()
+        self.assertIn("fields = ['id', 'name', ]\n        depth = 0", serializers_text)
+        self.assertNotIn("'groups'", serializers_text)
+        self.assertNotIn('select_related', apis_text)
+        self.assertNotIn('prefetch_related', apis_text)
+        self.assertNotIn('.only(', apis_text)
+
+    def test_m2m(self):
+        serializers_text, apis_text = self.generate('--m2m')
+        self.assertIn("fields = ['id', 'name', 'groups', ]", serializers_text)
+        self.assertIn("queryset = model.objects.prefetch_related('groups')\n", apis_text)
+
+    def test_depth(self):
+        serializers_text, apis_text = self.generate('--depth', '1')
+        self.assertIn('depth = 1', serializers_text)
+        self.assertIn("queryset = model.objects.select_related('tag')\n", apis_text)
+        self.assertIn("queryset = model.objects.select_related('team', 'group') \\\n"
+                      "        .prefetch_related('team__groups', 'group__permissions')\n", apis_text)
+
+    def test_only(self):
+        fields = Command.get_serializer_fields
+
+        def get_serializer_fields(model, m2m=False):
+            return [i for i in fields(model, m2m) if i.name != 'name']
+
+        with mock.patch.object(Command, 'get_serializer_fields', staticmethod(get_serializer_fields)):
+            lookups = Command().get_queryset_lookups(Project, depth=1)
+        self.assertEqual(lookups['only'], ['id', 'team', 'team__id', 'group', 'group__id'])
+        self.assertEqual(lookups['select_related'], ['team', 'group'])
+
+    def test_lookups_query_count(self):
+        group = Group.objects.create(name='group')
+        for i in range(3):
+            team = Team.objects.create(name='team_{}'.format(i))
+            team.groups.add(group)
+            Project.objects.create(name='project_{}'.format(i), team=team, group=group)
+
+        class ProjectSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Project
+                fields = ['id', 'name', 'team', 'group']
+                depth = 1
+
+        lookups = Command().get_queryset_lookups(Project, depth=1)
+        queryset = Project.objects.select_related(*lookups['select_related']) \
+            .prefetch_related(*lookups['prefetch_related'])
+        with self.assertNumQueries(3):
+            data = ProjectSerializer(queryset, many=True).data
+        self.assertEqual(data[0]['team']['groups'], [group.pk])
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.test import RequestFactory, TestCase
+from django.views.generic import View
+from rest_framework import serializers, viewsets
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from handyhelpers.drf_permissions import GroupScopedViewSetMixin
+from handyhelpers.permissions import GroupScopedQuerysetMixin
+from handyhelpers.querysets import filter_by_group_scope
+from testapp.models import Project, Team
+
+
+class ProjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ['id', 'name']
+
+
+class ProjectViewSet(GroupScopedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Project.objects.order_by('name')
+    serializer_class = ProjectSerializer
+    authentication_classes = []
+    permission_classes = []
+    group_scope_field = 'team__groups'
+
+
+class ProjectListView(GroupScopedQuerysetMixin, View):
+    queryset = Project.objects.order_by('name')
+    group_scope_field = 'group'
+
+    def get(self, request, *args, **kwargs):
+        return [i.name for i in self.queryset]
+
+
+class GroupScopeTests(TestCase):
+    def setUp(self):
+        self.red, self.blue, self.green = [Group.objects.create(name=i) for i in ('red', 'blue', 'green')]
+        shared = Team.objects.create(name='shared')
+        shared.groups.set([self.red, self.blue])
+        other = Team.objects.create(name='other')
+        other.groups.set([self.green])
+        Project.objects.create(name='alpha', team=shared, group=self.red)
+        Project.objects.create(name='bravo', team=other, group=self.green)
+        Project.objects.create(name='charlie', group=self.blue)
+        self.user = User.objects.create(username='user')
+        self.user.groups.set([self.red, self.blue])
+
+    def test_many_to_many_path(self):
+        # alpha belongs to both of the user's groups through its team, and is returned once
+        queryset = filter_by_group_scope(Project.objects.order_by('name'), self.user, 'team__groups')
+        self.assertEqual(list(queryset.values('name')), [{'name': 'alpha'}])
+        self.assertNotIn('EXISTS', str(queryset.query))
+
+    def test_foreign_key_path(self):
+        queryset = filter_by_group_scope(Project.objects.order_by('name'), self.user, 'group')
+        self.assertEqual(list(queryset.values_list('name', flat=True)), ['alpha', 'charlie'])
+        self.assertFalse(queryset.query.distinct)
+
+    def test_user_without_groups(self):
+        user = User.objects.create(username='nobody')
+        self.assertFalse(filter_by_group_scope(Project.objects.all(), user, 'team__groups').exists())
+
+    def test_anonymous_user(self):
+        self.assertFalse(filter_by_group_scope(Project.objects.all(), AnonymousUser(), 'group').exists())
+
+    def test_view(self):
+        request = RequestFactory().get('/projects/')
+        request.user = self.user
+        self.assertEqual(ProjectListView.as_view()(request), ['alpha', 'charlie'])
+        request.user = User.objects.create(username='admin', is_superuser=True)
+        self.assertEqual(ProjectListView.as_view()(request), ['alpha', 'bravo', 'charlie'])
+
+    def test_viewset(self):
+        view = ProjectViewSet.as_view({'get': 'list'})
+        request = APIRequestFactory().get('/projects/')
+        force_authenticate(request, self.user)
+        self.assertEqual([i['name'] for i in view(request).data], ['alpha'])
+        request = APIRequestFactory().get('/projects/')
+        force_authenticate(request, User.objects.create(username='admin', is_superuser=True))
+        self.assertEqual([i['name'] for i in view(request).data], ['alpha', 'bravo', 'charlie'])
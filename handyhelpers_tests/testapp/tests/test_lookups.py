@@ -0,0 +1,115 @@
+from django.db import connection
+from django.test import TestCase
+
+from testapp.models import Record, Tag
+
+
+class LookupTestCase(TestCase):
+    def setUp(self):
+        self.web = Tag.objects.create(name='web')
+        self.db = Tag.objects.create(name='db')
+        Record.objects.create(name='web01', status='open', tag=self.web)
+        Record.objects.create(name='web02', status='closed', tag=self.db)
+        Record.objects.create(name='db01', status='open')
+        Record.objects.create(name=None, status='closed', tag=self.web)
+
+    def assertNames(self, queryset, names):
+        self.assertEqual(sorted(queryset.values_list('name', flat=True), key=str), sorted(names, key=str))
+
+
+class NotEqualTests(LookupTestCase):
+    def test_nullable_field(self):
+        queryset = Record.objects.filter(name__ne='web01')
+        self.assertNames(queryset, ['web02', 'db01', None])
+        self.assertIn('<>', str(queryset.query))
+        self.assertIn('IS NULL', str(queryset.query))
+
+    def test_not_null_field(self):
+        queryset = Record.objects.filter(status__ne='open')
+        self.assertNames(queryset, ['web02', None])
+        self.assertNotIn('IS NULL', str(queryset.query))
+
+    def test_none(self):
+        queryset = Record.objects.filter(name__ne=None)
+        self.assertNames(queryset, ['web01', 'web02', 'db01'])
+        self.assertIn('IS NOT NULL', str(queryset.query))
+
+    def test_relation(self):
+        self.assertNames(Record.objects.filter(tag__ne=self.web), ['web02', 'db01'])
+        self.assertNames(Record.objects.filter(tag__ne=self.web.pk), ['web02', 'db01'])
+
+
+class ExcludeTests(LookupTestCase):
+    def test_excludes(self):
+        queryset = Record.objects.filter(name__excludes='web')
+        self.assertNames(queryset, ['db01', None])
+        self.assertIn('NOT (', str(queryset.query))
+        self.assertIn('IS NULL', str(queryset.query))
+
+    def test_iexcludes(self):
+        self.assertNames(Record.objects.filter(name__iexcludes='WEB'), ['db01', None])
+
+    def test_wildcards_are_escaped(self):
+        self.assertNames(Record.objects.filter(name__excludes='%'), ['web01', 'web02', 'db01', None])
+
+
+class PrefixTests(LookupTestCase):
+    def test_prefix(self):
+        queryset = Record.objects.filter(name__prefix='web')
+        self.assertNames(queryset, ['web01', 'web02'])
+        if connection.vendor == 'sqlite':
+            self.assertIn('>= web', str(queryset.query))
+            self.assertIn('< wec', str(queryset.query))
+            self.assertNotIn('LIKE', str(queryset.query))
+        else:
+            self.assertIn('LIKE', str(queryset.query))
+
+    def test_case_sensitive(self):
+        self.assertNames(Record.objects.filter(name__prefix='WEB'), [])
+
+
+class ExistsInTests(LookupTestCase):
+    def test_queryset(self):
+        queryset = Record.objects.filter(tag__exists_in=Tag.objects.filter(name='web'))
+        self.assertNames(queryset, ['web01', None])
+        self.assertIn('EXISTS', str(queryset.query))
+        self.assertNotIn(' IN ', str(queryset.query))
+
+    def test_values_queryset(self):
+        queryset = Tag.objects.filter(name__exists_in=Record.objects.filter(status='open').values('tag__name'))
+        self.assertEqual(list(queryset.values_list('name', flat=True)), ['web'])
+
+    def test_list_and_string(self):
+        self.assertNames(Record.objects.filter(tag__exists_in=[self.db.pk, None]), ['web02'])
+        queryset = Record.objects.filter(tag__exists_in='{},{}'.format(self.web.pk, self.db.pk))
+        self.assertNames(queryset, ['web01', 'web02', None])
+        self.assertIn(' IN ', str(queryset.query))
+
+    def test_empty_queryset(self):
+        self.assertNames(Record.objects.filter(tag__exists_in=Tag.objects.none()), [])
+        self.assertNames(Record.objects.filter(tag__exists_in=[]), [])
+
+
+class NotInSubqueryTests(LookupTestCase):
+    def test_queryset(self):
+        queryset = Record.objects.filter(tag__not_in_subquery=Tag.objects.filter(name='web'))
+        self.assertNames(queryset, ['web02', 'db01'])
+        self.assertIn('NOT EXISTS', str(queryset.query))
+
+    def test_subquery_selecting_nulls(self):
+        # NOT IN would match no rows at all, as the subquery selects a NULL name
+        closed = Record.objects.filter(status='closed').values('name')
+        self.assertNames(Record.objects.filter(name__not_in_subquery=closed), ['web01', 'db01', None])
+
+    def test_empty_subquery(self):
+        self.assertNames(Record.objects.filter(tag__not_in_subquery=Tag.objects.filter(name='none')),
+                         ['web01', 'web02', 'db01', None])
+        self.assertNames(Record.objects.filter(tag__not_in_subquery=Tag.objects.none()),
+                         ['web01', 'web02', 'db01', None])
+
+    def test_list_and_string(self):
+        queryset = Record.objects.filter(tag__not_in_subquery=[self.web.pk])
+        self.assertNames(queryset, ['web02', 'db01'])
+        self.assertIn('IS NULL', str(queryset.query))
+        self.assertNames(Record.objects.filter(tag__not_in_subquery=str(self.db.pk)), ['web01', 'db01', None])
+        self.assertNames(Record.objects.filter(tag__not_in_subquery=[]), ['web01', 'web02', 'db01', None])
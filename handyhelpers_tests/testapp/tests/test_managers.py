@@ -0,0 +1,175 @@
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from handyhelpers.managers import MODEL_INTROSPECTION_REGISTRY, clear_introspection_cache
+from testapp.models import Record, Tag, Token
+
+
+class GetManyOrNoneTests(TestCase):
+    def setUp(self):
+        self.records = [Record.objects.create(name='record_{}'.format(i)) for i in range(5)]
+
+    def test_pk(self):
+        pks = [i.pk for i in self.records]
+        results = Record.objects.get_many_or_none('pk', pks)
+        self.assertEqual(results, dict(zip(pks, self.records)))
+
+    def test_missing_values(self):
+        results = Record.objects.get_many_or_none('name', ['record_0', 'missing', 'record_0'])
+        self.assertEqual(results, {'record_0': self.records[0], 'missing': None})
+
+    def test_chunks(self):
+        names = ['record_{}'.format(i) for i in range(5)]
+        with self.assertNumQueries(3):
+            results = Record.objects.get_many_or_none('name', names, chunk_size=2)
+        self.assertEqual(list(results.values()), self.records)
+
+    def test_string_values_of_integer_field(self):
+        results = Record.objects.get_many_or_none('id', [str(self.records[1].pk)])
+        self.assertEqual(results, {str(self.records[1].pk): self.records[1]})
+
+    def test_identity_map(self):
+        identity_map = {self.records[0].pk: self.records[0]}
+        with self.assertNumQueries(1):
+            results = Record.objects.get_many_or_none('pk', [self.records[0].pk, self.records[1].pk],
+                                                      identity_map=identity_map)
+        self.assertIs(results[self.records[0].pk], self.records[0])
+        self.assertEqual(identity_map[self.records[1].pk], self.records[1])
+
+    def test_composite_key(self):
+        tag = Tag.objects.create(name='tag')
+        Record.objects.filter(pk=self.records[2].pk).update(tag=tag)
+        results = Record.objects.get_many_or_none(('name', 'tag'), [('record_2', tag), ('record_2', None),
+                                                                     ('record_3', tag.pk)])
+        self.assertEqual(results, {('record_2', tag): self.records[2], ('record_2', None): None,
+                                   ('record_3', tag.pk): None})
+
+
+class IntrospectionCacheTests(TestCase):
+    def setUp(self):
+        clear_introspection_cache(Record)
+
+    def test_results_are_cached_per_model(self):
+        names = Record.objects.get_field_names()
+        self.assertEqual(names, ('id', 'created_at', 'updated_at', 'name', 'status', 'amount', 'tag'))
+        self.assertIs(Record.objects.get_field_names(), names)
+        self.assertIn(Record, MODEL_INTROSPECTION_REGISTRY)
+
+    def test_clear_cache(self):
+        names = Record.objects.get_field_names()
+        clear_introspection_cache(Record)
+        self.assertNotIn(Record, MODEL_INTROSPECTION_REGISTRY)
+        self.assertIsNot(Record.objects.get_field_names(), names)
+        self.assertEqual(Record.objects.get_field_names(), names)
+
+    def test_exclude_list(self):
+        self.assertEqual(Record.objects.get_field_names(exclude_list='ForeignKey'),
+                         ('id', 'created_at', 'updated_at', 'name', 'status', 'amount'))
+        self.assertEqual(Record.objects.get_field_names(exclude_list=['ForeignKey', 'DecimalField']),
+                         ('id', 'created_at', 'updated_at', 'name', 'status'))
+        self.assertEqual([i.name for i in Record.objects.get_fields(exclude_list=('DateTimeField', ))],
+                         ['id', 'name', 'status', 'amount', 'tag'])
+
+    def test_foreign_keys_and_properties(self):
+        self.assertEqual(Record.objects.get_foreign_key_names(), ('tag', ))
+        self.assertIn('pk', Record.objects.get_properties())
+        self.assertEqual(len(Record.objects.get_fields_and_properties()),
+                         len(Record.objects.get_fields()) + len(Record.objects.get_properties()))
+
+
+class GetRandomRowsTests(TestCase):
+    def setUp(self):
+        Record.objects.bulk_create([Record(name='record_{}'.format(i), status=('open', 'closed')[i % 2])
+                                    for i in range(40)])
+
+    def test_probe(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = Record.objects.get_random_rows(5)
+        self.assertEqual(len({i.pk for i in rows}), 5)
+        self.assertFalse([i for i in queries.captured_queries if 'COUNT(' in i['sql']])
+
+    def test_filter(self):
+        rows = Record.objects.get_random_rows(5, status='open')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({i.status for i in rows}, {'open'})
+
+    def test_more_than_available(self):
+        rows = Record.objects.get_random_rows(30, status='closed')
+        self.assertEqual(sorted(i.pk for i in rows), list(Record.objects.filter(status='closed')
+                                                              .order_by('pk').values_list('pk', flat=True)))
+
+    def test_gaps(self):
+        keep = Record.objects.order_by('pk').values_list('pk', flat=True)[:3]
+        Record.objects.exclude(pk__in=list(keep)).delete()
+        Record.objects.create(name='last')
+        self.assertEqual(len({i.pk for i in Record.objects.get_random_rows(4)}), 4)
+
+    def test_seek(self):
+        with mock.patch.object(Record.objects, 'random_probe_rounds', 0):
+            rows = Record.objects.get_random_rows(5, status='open')
+        self.assertEqual(len({i.pk for i in rows}), 5)
+        self.assertEqual({i.status for i in rows}, {'open'})
+
+    def test_empty(self):
+        self.assertEqual(Record.objects.get_random_rows(5, name='missing'), [])
+        Record.objects.all().delete()
+        self.assertEqual(Record.objects.get_random_rows(5), [])
+
+    def test_uuid_seek(self):
+        Token.objects.bulk_create([Token(name='token_{}'.format(i)) for i in range(10)])
+        rows = Token.objects.get_random_rows(4)
+        self.assertEqual(len({i.pk for i in rows}), 4)
+        self.assertEqual(len(Token.objects.get_random_rows(20)), 10)
+
+    def test_order_by_random(self):
+        Token.objects.create(name='token')
+        with mock.patch('handyhelpers.managers.models.UUIDField', type(None)):
+            with CaptureQueriesContext(connection) as queries:
+                rows = Token.objects.get_random_rows(2)
+        self.assertEqual(len(rows), 1)
+        self.assertIn('RANDOM()', queries.captured_queries[-1]['sql'])
+
+
+class UpdateManyTests(TestCase):
+    def setUp(self):
+        self.records = [Record.objects.create(name='record_{}'.format(i)) for i in range(5)]
+
+    def test_values_per_row(self):
+        tag = Tag.objects.create(name='tag')
+        Record.objects.update(updated_at=self.records[0].updated_at - datetime.timedelta(days=1))
+        values = {self.records[0].pk: {'status': 'closed'},
+                  self.records[1].pk: {'name': 'renamed', 'amount': Decimal('2.50'), 'tag': tag},
+                  self.records[2].pk: {'amount': F('amount') + 1}}
+        with self.assertNumQueries(1):
+            self.assertEqual(Record.objects.update_many(values), 3)
+        rows = {i[0]: i[1:] for i in Record.objects.values_list('pk', 'name', 'status', 'amount', 'tag')}
+        self.assertEqual(rows[self.records[0].pk], ('record_0', 'closed', Decimal('0'), None))
+        self.assertEqual(rows[self.records[1].pk], ('renamed', 'open', Decimal('2.50'), tag.pk))
+        self.assertEqual(rows[self.records[2].pk], ('record_2', 'open', Decimal('1'), None))
+        self.assertEqual(rows[self.records[3].pk], ('record_3', 'open', Decimal('0'), None))
+        updated = Record.objects.filter(updated_at__gte=self.records[0].updated_at).values_list('pk', flat=True)
+        self.assertEqual(sorted(updated), [i.pk for i in self.records[:3]])
+
+    def test_batches(self):
+        values = {i.pk: {'name': 'renamed_{}'.format(i.pk)} for i in self.records}
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Record.objects.update_many(values, batch_size=2), 5)
+        statements = [i['sql'] for i in queries.captured_queries if i['sql'].startswith('UPDATE')]
+        self.assertEqual(len(statements), 3)
+        self.assertIn('CASE WHEN', statements[0])
+        self.assertEqual(sorted(Record.objects.values_list('name', flat=True)),
+                         sorted('renamed_{}'.format(i.pk) for i in self.records))
+
+    def test_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(Record.objects.update_many({}), 0)
+
+    def test_primary_key(self):
+        with self.assertRaises(ValueError):
+            Record.objects.update_many({self.records[0].pk: {'id': 100}})
@@ -0,0 +1,100 @@
+import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from testapp.models import Record, Tag
+
+
+class DirtyFieldsTests(TestCase):
+    def setUp(self):
+        Record.objects.create(name='record', amount=Decimal('1.50'))
+        self.record = Record.objects.get()
+
+    def save(self, obj, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            obj.save(**kwargs)
+        return [i['sql'] for i in queries.captured_queries]
+
+    def test_get_dirty_fields(self):
+        self.assertEqual(self.record.get_dirty_fields(), {})
+        self.record.name = 'changed'
+        self.record.tag = Tag.objects.create(name='tag')
+        self.assertEqual(self.record.get_dirty_fields(), {'name': 'record', 'tag': None})
+        self.record.save()
+        self.assertEqual(self.record.get_dirty_fields(), {})
+
+    def test_new_instance_has_no_dirty_fields(self):
+        self.assertEqual(Record(name='new').get_dirty_fields(), {})
+
+    def test_unchanged_save_is_skipped(self):
+        self.record.name = 'record'
+        self.assertEqual(self.save(self.record), [])
+
+    def test_only_changed_fields_are_written(self):
+        self.record.status = 'closed'
+        statements = self.save(self.record)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('"status"', statements[0])
+        self.assertIn('"updated_at"', statements[0])
+        self.assertNotIn('"name"', statements[0])
+        self.assertNotIn('"amount"', statements[0])
+
+    def test_updated_at_is_bumped(self):
+        updated_at = self.record.updated_at
+        Record.objects.update(updated_at=updated_at - datetime.timedelta(days=1))
+        self.record.status = 'closed'
+        self.record.save()
+        self.assertGreaterEqual(Record.objects.get().updated_at, updated_at)
+
+    def test_concurrent_changes_to_other_fields_are_kept(self):
+        Record.objects.update(name='changed elsewhere')
+        self.record.status = 'closed'
+        self.record.save()
+        self.assertEqual(Record.objects.values_list('name', 'status').get(), ('changed elsewhere', 'closed'))
+
+    def test_deleted_row_is_inserted_again(self):
+        Record.objects.all().delete()
+        self.record.status = 'closed'
+        self.record.save()
+        self.assertEqual(Record.objects.values_list('pk', 'name', 'status').get(),
+                         (self.record.pk, 'record', 'closed'))
+
+    def test_update_fields_are_respected(self):
+        self.record.name = 'changed'
+        self.record.status = 'closed'
+        self.record.save(update_fields=['status'])
+        self.assertEqual(Record.objects.values_list('name', 'status').get(), ('record', 'closed'))
+        self.assertEqual(self.record.get_dirty_fields(), {'name': 'record'})
+
+
+class UpdateTests(TestCase):
+    def setUp(self):
+        Record.objects.create(name='record')
+        self.record = Record.objects.get()
+
+    def test_only_provided_fields_are_written(self):
+        Record.objects.update(name='changed elsewhere')
+        with CaptureQueriesContext(connection) as queries:
+            self.record.update(status='closed')
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertNotIn('"name"', queries.captured_queries[0]['sql'])
+        self.assertIn('"updated_at"', queries.captured_queries[0]['sql'])
+        self.assertEqual(Record.objects.values_list('name', 'status').get(), ('changed elsewhere', 'closed'))
+
+    def test_attname(self):
+        tag = Tag.objects.create(name='tag')
+        self.record.update(tag_id=tag.pk)
+        self.assertEqual(Record.objects.get().tag, tag)
+
+    def test_non_field_attribute(self):
+        self.record.update(name='changed', note='not a field')
+        self.assertEqual(self.record.note, 'not a field')
+        self.assertEqual(Record.objects.get().name, 'changed')
+
+    def test_unsaved_instance(self):
+        record = Record(name='new')
+        record.update(status='closed')
+        self.assertEqual(Record.objects.values_list('status', flat=True).get(pk=record.pk), 'closed')
@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from handyhelpers.managers import resolve_children
+from testapp.models import Animal, Cat, Dog, Puppy
+
+
+class ParentModelTests(TestCase):
+    def setUp(self):
+        self.animal = Animal.objects.create(name='animal')
+        self.dog = Dog.objects.create(name='dog')
+        self.puppy = Puppy.objects.create(name='puppy')
+        self.cat = Cat.objects.create(name='cat')
+
+    def get_parents(self):
+        return list(Animal.objects.order_by('pk'))
+
+    def test_child_type_is_stored(self):
+        self.assertEqual(dict(Animal.objects.values_list('name', 'child_type')),
+                         {'animal': 'testapp.animal', 'dog': 'testapp.dog', 'puppy': 'testapp.puppy',
+                          'cat': 'testapp.cat'})
+
+    def test_get_child(self):
+        animal, dog, puppy, cat = self.get_parents()
+        with self.assertNumQueries(0):
+            self.assertIsNone(animal.get_child())
+        with self.assertNumQueries(1):
+            self.assertEqual(dog.get_child(), self.dog)
+        with self.assertNumQueries(1):
+            self.assertEqual(cat.get_child(), self.cat)
+        with self.assertNumQueries(2):
+            self.assertEqual(puppy.get_grandchild(), self.puppy)
+        with self.assertNumQueries(0):
+            self.assertIsNone(dog.get_grandchild())
+
+    def test_get_child_without_child_type(self):
+        Animal.objects.update(child_type='')
+        animal, dog, puppy, cat = self.get_parents()
+        self.assertIsNone(animal.get_child())
+        self.assertEqual(cat.get_child(), self.cat)
+        self.assertEqual(puppy.get_grandchild(), self.puppy)
+
+    def test_get_child_without_child_type_field(self):
+        with mock.patch.object(Animal, 'child_type_field', None):
+            animal, dog, puppy, cat = self.get_parents()
+            self.assertIsNone(animal.get_child())
+            self.assertEqual(cat.get_child(), self.cat)
+            self.assertEqual(puppy.get_grandchild(), self.puppy)
+
+    def test_resolve_children_queryset(self):
+        queryset = resolve_children(Animal.objects.order_by('pk'), depth=2)
+        with self.assertNumQueries(1):
+            children = [i.get_child() for i in queryset]
+            grandchildren = [i.get_grandchild() for i in queryset]
+        self.assertEqual(children, [None, self.dog, Dog.objects.get(pk=self.puppy.pk), self.cat])
+        self.assertEqual(grandchildren, [None, None, self.puppy, None])
+
+    def test_resolve_children_list(self):
+        parents = self.get_parents()
+        with self.assertNumQueries(3):
+            self.assertEqual(resolve_children(parents, depth=2), parents)
+        with self.assertNumQueries(0):
+            self.assertEqual([i.get_grandchild() for i in parents], [None, None, self.puppy, None])
+
+    def test_resolve_children_skips_child_models_by_child_type(self):
+        dogs = [i for i in self.get_parents() if i.child_type == 'testapp.dog']
+        with self.assertNumQueries(1):
+            resolve_children(dogs)
+        with self.assertNumQueries(0):
+            self.assertEqual(dogs[0].get_child(), self.dog)
+
+    def test_child_type_of_extended_row(self):
+        Dog(animal_ptr=self.animal, name='animal', created_at=self.animal.created_at).save()
+        Animal.objects.filter(pk=self.animal.pk).update(child_type='testapp.animal')
+        dog = Dog.objects.get(pk=self.animal.pk)
+        dog.breed = 'collie'
+        dog.save(update_fields=['breed'])
+        self.assertEqual(Animal.objects.get(pk=self.animal.pk).child_type, 'testapp.dog')
+        self.assertEqual(Animal.objects.get(pk=self.animal.pk).get_child(), dog)
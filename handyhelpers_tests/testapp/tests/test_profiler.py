@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.http import HttpResponse
+from django.template import Context
+from django.template.base import Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from handyhelpers import profiler
+
+
+class RequestProfileTests(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'profiler.sqlite3')
+        self.request = RequestFactory().get('/records/')
+
+    def tearDown(self):
+        profiler.close_store_connection(self.path)
+
+    def save(self):
+        profile = profiler.RequestProfile()
+        profile.shapes = {'SELECT ?': (2, 0.001)}
+        profile.save(self.path, self.request, HttpResponse('ok'), 0.01)
+
+    def test_store_is_created_once(self):
+        with mock.patch('handyhelpers.profiler.sqlite3.connect', wraps=sqlite3.connect) as connect:
+            for _ in range(3):
+                self.save()
+        self.assertEqual(connect.call_count, 1)
+        db = profiler.get_store_connection(self.path)
+        self.assertEqual(db.execute('SELECT COUNT(*), MIN(path) FROM requests').fetchone(), (3, '/records/'))
+        self.assertEqual(db.execute('SELECT SUM(count) FROM queries').fetchone(), (6, ))
+
+    def test_removed_store_is_created_again(self):
+        self.save()
+        os.remove(self.path)
+        self.save()
+        self.assertEqual(profiler.get_store_connection(self.path).execute('SELECT COUNT(*) FROM requests').fetchone(),
+                         (1, ))
+
+
+class ProfilerMiddlewareTests(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'profiler.sqlite3')
+        self.render = Template.render
+        self.renders = []
+
+    def tearDown(self):
+        profiler.close_store_connection(self.path)
+
+    def view(self, request):
+        self.renders.append(Template.render)
+        return HttpResponse(Template('{{ value }}').render(Context({'value': 'ok'})))
+
+    def get(self, sample_rate):
+        with override_settings(PROFILER_SAMPLE_RATE=sample_rate, PROFILER_DATABASE=self.path):
+            middleware = profiler.ProfilerMiddleware(self.view)
+            self.assertIs(Template.render, self.render)
+            return middleware(RequestFactory().get('/records/'))
+
+    def test_sampled_request(self):
+        self.assertEqual(self.get(1).content, b'ok')
+        self.assertIsNot(self.renders[0], self.render)
+        self.assertIs(Template.render, self.render)
+        db = profiler.get_store_connection(self.path)
+        self.assertEqual(db.execute('SELECT COUNT(*) FROM requests WHERE template_ms > 0').fetchone(), (1, ))
+
+    def test_request_not_sampled(self):
+        with mock.patch('handyhelpers.profiler.random.random', return_value=0.5):
+            self.assertEqual(self.get(0.1).content, b'ok')
+        self.assertIs(self.renders[0], self.render)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_concurrent_profiled_requests(self):
+        with profiler.profile_templates():
+            wrapped = Template.render
+            with profiler.profile_templates():
+                self.assertIs(Template.render, wrapped)
+            self.assertIs(Template.render, wrapped)
+        self.assertIs(Template.render, self.render)
+
+
+class PercentileTests(TestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 11))
+        self.assertEqual([profiler.percentile(values, i) for i in (0, 50, 90, 99, 100)], [1, 5, 9, 10, 10])
+        self.assertEqual(profiler.percentile([], 50), 0)
@@ -0,0 +1,35 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from handyhelpers.querysets import approx_count, percentiles
+from testapp.models import Record
+
+
+class PercentilesTests(TestCase):
+    def setUp(self):
+        Record.objects.bulk_create([Record(name='record_{}'.format(i), amount=Decimal(i) / 4) for i in range(1, 12)])
+
+    def test_decimal_field(self):
+        results = percentiles(Record.objects.all(), 'amount', percents=(0, 50, 95, 100))
+        self.assertEqual(results, {0: 0.25, 50: 1.5, 95: 2.625, 100: 2.75})
+
+    def test_decimal_field_sampled(self):
+        results = percentiles(Record.objects.all(), 'amount', percents=(50, ), sample_size=5)
+        self.assertIsInstance(results[50], float)
+
+    def test_empty_queryset(self):
+        self.assertEqual(percentiles(Record.objects.none(), 'amount', percents=(50, )), {50: None})
+
+
+class ApproxCountTests(TestCase):
+    def setUp(self):
+        Record.objects.bulk_create([Record(name='record_{}'.format(i)) for i in range(1, 6)])
+
+    def test_empty_sample(self):
+        # a selective filter on a large table often leaves the sample empty; the table must not be counted
+        with mock.patch('handyhelpers.querysets.get_sample_queryset', side_effect=lambda qs, f: (qs.none(), f)):
+            with self.assertNumQueries(0):
+                result = approx_count(Record.objects.all(), fraction=0.01)
+        self.assertEqual((result['estimate'], result['lower'], result['upper']), (0, 0, 297))
@@ -0,0 +1,61 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from handyhelpers.models import Rollup, RollupWatermark
+from handyhelpers.querysets import count_by_interval
+from handyhelpers.rollups import count_by_interval_rollup, update_rollup
+from testapp.models import Record
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.create_records([now - datetime.timedelta(hours=3)] * 2, 'open')
+        self.create_records([now - datetime.timedelta(hours=2)], 'closed')
+        self.create_records([now - datetime.timedelta(seconds=10)], 'open')
+
+    @staticmethod
+    def create_records(created, status):
+        for i in created:
+            record = Record.objects.create(name='record', status=status)
+            Record.objects.filter(pk=record.pk).update(created_at=i)
+
+    def test_update_rollup(self):
+        self.assertEqual(update_rollup(Record), 3)
+        self.assertEqual(sum(Rollup.objects.values_list('count', flat=True)), 3)
+        watermark = RollupWatermark.objects.get(model_label='testapp.Record', field_name='created_at', dimension='')
+        self.assertLess(watermark.watermark, timezone.now() - datetime.timedelta(seconds=59))
+        self.assertEqual(update_rollup(Record), 0)
+
+    def test_update_rollup_increments_buckets(self):
+        update_rollup(Record)
+        self.create_records([timezone.now() - datetime.timedelta(seconds=5)], 'open')
+        self.assertEqual(update_rollup(Record, settle_seconds=0), 2)
+        self.assertEqual(sum(Rollup.objects.values_list('count', flat=True)), 5)
+        self.assertEqual(Rollup.objects.filter(count=0).count(), 0)
+
+    def test_live_tail_stitching(self):
+        expected = count_by_interval(Record.objects.all(), 'created_at', 'hour', 6, 'UTC')
+        self.assertEqual(count_by_interval_rollup(Record, 'created_at', 'hour', 6, 'UTC'), expected)
+        update_rollup(Record)
+        self.assertEqual(count_by_interval_rollup(Record, 'created_at', 'hour', 6, 'UTC'), expected)
+        self.assertEqual(count_by_interval_rollup(Record, 'created_at', 'day', 2, 'UTC'),
+                         count_by_interval(Record.objects.all(), 'created_at', 'day', 2, 'UTC'))
+
+    def test_reads_rolled_up_rows_from_rollups(self):
+        expected = count_by_interval(Record.objects.all(), 'created_at', 'hour', 6, 'UTC')
+        update_rollup(Record)
+        Record.objects.filter(created_at__lt=timezone.now() - datetime.timedelta(hours=1)).delete()
+        self.assertEqual(count_by_interval_rollup(Record, 'created_at', 'hour', 6, 'UTC'), expected)
+
+    def test_dimension(self):
+        self.assertEqual(update_rollup(Record, dimension='status'), 3)
+        self.assertEqual(set(Rollup.objects.filter(dimension='status').values_list('value', flat=True)),
+                         {'open', 'closed'})
+        counts = count_by_interval_rollup(Record, 'created_at', 'hour', 6, 'UTC', dimension='status')
+        self.assertEqual(sorted(counts), ['closed', 'open'])
+        self.assertEqual(counts['open'], count_by_interval(Record.objects.filter(status='open'), 'created_at', 'hour',
+                                                           6, 'UTC'))
+        self.assertEqual(sum(counts['closed']), 1)
@@ -0,0 +1,35 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from handyhelpers.search import SEARCH_INDEX_REGISTRY, get_search_backend, has_search_index, search
+from testapp.models import Record
+
+
+@override_settings(SEARCH_DEFINITIONS=[{'model': 'testapp.Record', 'fields': ['name', 'status']}])
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        SEARCH_INDEX_REGISTRY.clear()
+        self.backend = get_search_backend(connection)
+        Record.objects.create(name='web01', status='open')
+        Record.objects.create(name='db01', status='closed')
+
+    def tearDown(self):
+        self.backend.drop_index(connection, Record)
+        SEARCH_INDEX_REGISTRY.clear()
+
+    def test_index_built_later_is_used(self):
+        self.assertFalse(has_search_index(connection, Record, ['name', 'status']))
+        self.backend.build_index(connection, Record, ['name', 'status'])
+        self.assertTrue(has_search_index(connection, Record, ['name', 'status']))
+        queryset = search(Record.objects.all(), 'web')
+        self.assertEqual([i.name for i in queryset], ['web01'])
+        if connection.vendor == 'sqlite':
+            self.assertIn('MATCH', str(queryset.query))
+
+    def test_index_of_other_fields_is_not_used(self):
+        self.backend.build_index(connection, Record, ['name'])
+        self.assertTrue(has_search_index(connection, Record, ['name']))
+        self.assertFalse(has_search_index(connection, Record, ['name', 'status']))
+        queryset = search(Record.objects.all(), 'closed')
+        self.assertEqual([i.name for i in queryset], ['db01'])
+        self.assertNotIn('MATCH', str(queryset.query))
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+
+from handyhelpers.views.gui import HandyHelperSingletonView
+from handyhelpers.models import SINGLETON_CACHE
+from testapp.models import Preferences, Tag
+
+
+@override_settings(SINGLETON_CACHE_ENABLED=True)
+class SingletonLoadTests(TestCase):
+    def setUp(self):
+        SINGLETON_CACHE.clear()
+        Preferences.objects.create(tag=Tag.objects.create(name='original'))
+
+    def test_load_returns_independent_copies(self):
+        obj = Preferences.load()
+        obj.title = 'changed'
+        obj._state.adding = True
+        cached = Preferences.load()
+        self.assertEqual(cached.title, 'handyhelpers')
+        self.assertFalse(cached._state.adding)
+
+    def test_load_copies_related_objects(self):
+        Preferences.load()
+        SINGLETON_CACHE[Preferences][0].tag
+        Preferences.load().tag.name = 'changed'
+        self.assertEqual(Preferences.load().tag.name, 'original')
+
+
+class SingletonCacheEnabledTests(TestCase):
+    def setUp(self):
+        SINGLETON_CACHE.clear()
+
+    def test_local_memory_cache(self):
+        Preferences.load()
+        self.assertFalse(Preferences.is_cache_enabled())
+        self.assertNotIn(Preferences, SINGLETON_CACHE)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_dummy_cache(self):
+        self.assertFalse(Preferences.is_cache_enabled())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'cache_table'}})
+    def test_shared_cache(self):
+        self.assertTrue(Preferences.is_cache_enabled())
+
+    @override_settings(SINGLETON_CACHE_ENABLED=True)
+    def test_setting(self):
+        Preferences.load()
+        self.assertIn(Preferences, SINGLETON_CACHE)
+
+
+class SingletonViewTests(TestCase):
+    def get_object(self, model):
+        view = HandyHelperSingletonView.as_view(model=model, template_name='singleton.html')
+        with mock.patch('handyhelpers.views.gui.render') as render:
+            view(RequestFactory().get('/'))
+        return render.call_args[0][2]['object']
+
+    def test_singleton_model(self):
+        SINGLETON_CACHE.clear()
+        self.assertEqual(self.get_object(Preferences).pk, 1)
+
+    def test_plain_model(self):
+        tag = Tag.objects.create(name='only')
+        self.assertEqual(self.get_object(Tag), tag)
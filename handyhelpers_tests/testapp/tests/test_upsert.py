@@ -0,0 +1,79 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from testapp.models import Host
+
+
+class BulkUpsertTests(TestCase):
+    """ bulk_upsert with INSERT ... ON CONFLICT (SQLite 3.24+) """
+    def setUp(self):
+        Host.objects.create(hostname='web1', ip='10.0.0.1', status='down')
+        Host.objects.create(hostname='web2', ip='10.0.0.2', status='down')
+        self.created_at = Host.objects.get(hostname='web1').created_at - datetime.timedelta(days=1)
+        Host.objects.update(created_at=self.created_at, updated_at=self.created_at)
+
+    def upsert(self, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            result = Host.objects.bulk_upsert(*args, **kwargs)
+        self.statements = [i['sql'] for i in queries.captured_queries]
+        return result
+
+    def get_hosts(self):
+        return {i.hostname: i for i in Host.objects.all()}
+
+    def test_insert_and_update(self):
+        rows = [{'hostname': 'web1', 'ip': '10.0.1.1'}, {'hostname': 'web3', 'ip': '10.0.0.3'}]
+        self.assertEqual(self.upsert(rows, ['hostname']), (1, 1))
+        hosts = self.get_hosts()
+        self.assertEqual(len(hosts), 3)
+        self.assertEqual((hosts['web1'].ip, hosts['web1'].status), ('10.0.1.1', 'down'))
+        self.assertEqual(hosts['web1'].created_at, self.created_at)
+        self.assertGreater(hosts['web1'].updated_at, self.created_at)
+        self.assertEqual(hosts['web2'].updated_at, self.created_at)
+        self.assertEqual((hosts['web3'].ip, hosts['web3'].status), ('10.0.0.3', 'up'))
+        self.assertGreater(hosts['web3'].created_at, self.created_at)
+
+    def test_update_fields(self):
+        rows = [{'hostname': 'web1', 'ip': '10.0.1.1', 'status': 'up'}]
+        self.assertEqual(self.upsert(rows, ['hostname'], update_fields=['status']), (0, 1))
+        self.assertEqual(Host.objects.values_list('ip', 'status').get(hostname='web1'), ('10.0.0.1', 'up'))
+
+    def test_instances(self):
+        self.assertEqual(self.upsert([Host(hostname='web2', ip='10.0.1.2'), Host(hostname='web4')], ['hostname']),
+                         (1, 1))
+        hosts = self.get_hosts()
+        self.assertEqual((hosts['web2'].ip, hosts['web2'].status), ('10.0.1.2', 'up'))
+        self.assertEqual(hosts['web2'].created_at, self.created_at)
+        self.assertIn('web4', hosts)
+
+    def test_duplicate_keys(self):
+        rows = [{'hostname': 'web3', 'ip': '10.0.0.3'}, {'hostname': 'web3', 'ip': '10.0.0.4'}]
+        self.assertEqual(self.upsert(rows, ['hostname']), (1, 0))
+        self.assertEqual(Host.objects.get(hostname='web3').ip, '10.0.0.4')
+
+    def test_empty(self):
+        self.assertEqual(self.upsert([], ['hostname']), (0, 0))
+        self.assertEqual(self.statements, [])
+
+    def test_statements(self):
+        rows = [{'hostname': 'web{}'.format(i), 'ip': '10.0.0.{}'.format(i)} for i in range(1, 6)]
+        self.assertEqual(self.upsert(rows, ['hostname'], batch_size=2), (3, 2))
+        inserts = [i for i in self.statements if i.startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+        self.assertIn('ON CONFLICT ("hostname") DO UPDATE SET', inserts[0])
+        self.assertFalse([i for i in self.statements if i.startswith('UPDATE')])
+
+
+@mock.patch.object(connection.Database, 'sqlite_version_info', (3, 23, 0))
+class BulkUpsertFallbackTests(BulkUpsertTests):
+    """ bulk_upsert with bulk_update and bulk_create (SQLite before 3.24) """
+    def test_statements(self):
+        rows = [{'hostname': 'web{}'.format(i), 'ip': '10.0.0.{}'.format(i)} for i in range(1, 6)]
+        self.assertEqual(self.upsert(rows, ['hostname'], batch_size=2), (3, 2))
+        self.assertFalse([i for i in self.statements if 'ON CONFLICT' in i])
+        self.assertEqual(len([i for i in self.statements if i.startswith('UPDATE')]), 1)
+        self.assertEqual(len([i for i in self.statements if i.startswith('INSERT')]), 2)